@@ -1,11 +1,29 @@
 import os
+import time
+import asyncio
 import logging
+
+_t0 = time.perf_counter()
 import discord
 from discord.ext import commands
-from config import DISCORD_TOKEN, MOD_CHANNEL_ID, DELETE_THRESHOLD, FLAG_THRESHOLD, WARN_DM_TEXT, LOG_FILE
-from model.predict import predict
-from utils.logger import log_event
-from utils.report_generator import add_to_report  # ✅ NEW IMPORT
+_discord_import = time.perf_counter() - _t0
+
+from config import DISCORD_TOKEN, MOD_CHANNEL_ID, DELETE_THRESHOLD, FLAG_THRESHOLD, WARN_DM_TEXT
+from utils import startup
+from utils.permission_cache import PermissionCache
+from utils.scanner import ScanCheckpoints, scan_channel, parse_since, is_scanning
+from utils.scheduler import FairScheduler
+from utils.overload import OverloadController
+from model.scoring_service import SCORING_SOCKET, get_backend
+
+# The model (joblib/sklearn), online learner and HTML logger are imported
+# on the warm-up thread started from on_ready; see utils/startup.py.
+startup.record_import("discord", _discord_import)
+
+# 🧩 Sharded mode (see shards.py): scoring and logging live in the shared
+# scoring service, so this process doesn't load the model at all
+if SCORING_SOCKET:
+    startup.use_remote_scoring()
 
 logging.basicConfig(level=logging.INFO)
 
@@ -15,23 +33,93 @@ intents.messages = True
 intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+_shard_kwargs = {}
+if os.environ.get("PRISM_SHARD_COUNT"):
+    _shard_kwargs = {"shard_id": int(os.environ.get("PRISM_SHARD_ID", "0")),
+                     "shard_count": int(os.environ["PRISM_SHARD_COUNT"])}
+
+bot = commands.Bot(command_prefix="!", intents=intents, **_shard_kwargs)
+backend = get_backend()
+perm_cache = PermissionCache()
+scheduler = FairScheduler()
+overload = OverloadController(queue_delay=scheduler.oldest_wait)
+checkpoints = ScanCheckpoints()
+_background_tasks = set()
 
 
 @bot.event
 async def on_ready():
     print(f"✅ PRISM online as {bot.user} (id: {bot.user.id})")
     print("Connected guilds:", [g.name for g in bot.guilds])
+    overload.start()
+    startup.start_warmup()
+
+
+def _on_warmup_done(future):
+    if future.exception() is not None:
+        logging.error("Model warm-up failed: %s", future.exception())
+        return
+    logging.info(startup.format_report())
+    if SCORING_SOCKET:
+        # the scoring service applies feedback to the shared model
+        return
+
+    from model.online import learner as feedback_learner
+    if not feedback_learner.is_alive():
+        feedback_learner.start()
+
+
+# runs after every warm-up attempt, so a retry after a failed first
+# warm-up (e.g. model not trained yet) still starts the learner
+startup.add_done_callback(_on_warmup_done)
+
+
+def _has_mod_perms(member: discord.Member, channel: discord.TextChannel):
+    perms = channel.permissions_for(member)
+    return perms.manage_messages or perms.kick_members or perms.ban_members or perms.administrator
 
 
 def is_admin_member(member: discord.Member, channel: discord.TextChannel):
     try:
-        perms = channel.permissions_for(member)
-        return perms.manage_messages or perms.kick_members or perms.ban_members or perms.administrator
+        key = (channel.guild.id, channel.id, member.id)
+        return perm_cache.get(key, lambda: _has_mod_perms(member, channel))
     except Exception:
         return False
 
 
+# 🔄 Keep the permission cache in sync with role / overwrite / ownership changes
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    # roles, timeouts and anything else that can change what a member may do
+    perm_cache.invalidate_member(after.guild.id, after.id)
+
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    perm_cache.invalidate_guild(after.guild.id)
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    # members lose the role without an on_member_update
+    perm_cache.invalidate_guild(role.guild.id)
+
+
+@bot.event
+async def on_guild_update(before: discord.Guild, after: discord.Guild):
+    # e.g. ownership transfer
+    perm_cache.invalidate_guild(after.id)
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if isinstance(after, discord.CategoryChannel):
+        # synced child channels inherit the category's overwrites
+        perm_cache.invalidate_guild(after.guild.id)
+    else:
+        perm_cache.invalidate_channel(after.guild.id, after.id)
+
+
 @bot.event
 async def on_message(message: discord.Message):
     # Ignore bot messages
@@ -47,11 +135,49 @@ async def on_message(message: discord.Message):
         await bot.process_commands(message)
         return
 
+    # Under heavy overload only a sample of messages is scored
+    if not overload.admit(message.guild.id):
+        await bot.process_commands(message)
+        return
+
+    # Classification is queued per guild so a raid on one server
+    # can't delay moderation everywhere else. It isn't awaited, so
+    # moderator commands never wait behind a raided guild's queue.
     try:
-        label, prob = predict(text)
+        job = scheduler.submit(message.guild.id, lambda: moderate_message(message, text))
+        job.add_done_callback(_log_moderation_failure)
+    except asyncio.QueueFull:
+        logging.warning("Moderation queue full for guild %s; message %s not scanned.",
+                        message.guild.id, message.id)
+
+    await bot.process_commands(message)
+
+
+def _log_moderation_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logging.error("Moderation failed: %s", future.exception(), exc_info=future.exception())
+
+
+async def moderate_message(message: discord.Message, text: str):
+    try:
+        await startup.wait_ready()
+        if overload.use_model(message.guild.id):
+            # off the event loop (or in the scoring service), so several
+            # guilds can be classified at once
+            label, prob = (await backend.score([text]))[0]
+        else:
+            from model.predict import predict_cheap
+            result = predict_cheap(text)
+            if result is None:
+                return
+            label, prob = result
     except Exception as e:
         logging.exception("Prediction failed: %s", e)
-        await bot.process_commands(message)
+        return
+
+    # prob is the confidence of the predicted label, so a confident
+    # "normal" must not be treated as a violation
+    if label == "normal":
         return
 
     is_admin = is_admin_member(message.author, message.channel)
@@ -70,7 +196,8 @@ async def on_message(message: discord.Message):
 
             await notify_moderators(bot, message, label, prob, action="deleted")
 
-            log_event({
+            # ✅ Log and add to report dashboard
+            await backend.log({
                 "action": "deleted",
                 "user": str(message.author),
                 "user_id": message.author.id,
@@ -80,15 +207,6 @@ async def on_message(message: discord.Message):
                 "prob": prob
             })
 
-            # ✅ Add to report dashboard
-            add_to_report(
-                message.content,
-                str(message.author),
-                f"{message.guild.name}/{message.channel.name}",
-                label,
-                prob
-            )
-
         except discord.Forbidden:
             logging.warning("Bot lacks permissions to delete messages in this channel.")
         except Exception as e:
@@ -99,7 +217,12 @@ async def on_message(message: discord.Message):
         action_taken = "flagged"
         await notify_moderators(bot, message, label, prob, action="flagged")
 
-        log_event({
+        # low-confidence flags aren't written to disk while overloaded
+        if not overload.should_log("flagged", prob, message.guild.id):
+            return
+
+        # ✅ Log and add to report dashboard
+        await backend.log({
             "action": "flagged",
             "user": str(message.author),
             "user_id": message.author.id,
@@ -109,16 +232,31 @@ async def on_message(message: discord.Message):
             "prob": prob
         })
 
-        # ✅ Add to report dashboard
-        add_to_report(
-            message.content,
-            str(message.author),
-            f"{message.guild.name}/{message.channel.name}",
-            label,
-            prob
-        )
 
-    await bot.process_commands(message)
+# ✅ / ❌ reactions on mod-channel alerts feed back into the model
+FEEDBACK_CORRECT = "✅"
+FEEDBACK_WRONG = "❌"
+
+
+@bot.event
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    if payload.channel_id != MOD_CHANNEL_ID or payload.user_id == bot.user.id:
+        return
+    emoji = str(payload.emoji)
+    if emoji not in (FEEDBACK_CORRECT, FEEDBACK_WRONG):
+        return
+
+    if not startup.is_ready():
+        return
+    from model.online import learner as feedback_learner
+
+    alert = feedback_learner.lookup(payload.message_id)
+    channel = bot.get_channel(payload.channel_id)
+    if alert is None or payload.member is None or not is_admin_member(payload.member, channel):
+        return
+
+    label = alert["label"] if emoji == FEEDBACK_CORRECT else "normal"
+    await backend.feedback(alert["text"], label, source="reaction", moderator=str(payload.member))
 
 
 async def notify_moderators(bot, message, label, prob, action="flagged"):
@@ -139,7 +277,15 @@ async def notify_moderators(bot, message, label, prob, action="flagged"):
             embed.add_field(name="Author", value=f"{message.author} ({message.author.id})", inline=False)
             embed.add_field(name="Channel", value=f"#{message.channel.name}", inline=False)
             embed.add_field(name="Message", value=message.content[:1000] or "<no text>", inline=False)
-            await ch.send(embed=embed)
+            embed.set_footer(text=f"{FEEDBACK_CORRECT} correct · {FEEDBACK_WRONG} not a violation · !label {message.id} <label>")
+            alert = await ch.send(embed=embed)
+            from model.online import learner as feedback_learner
+            feedback_learner.track(alert.id, message.id, message.content, label)
+            try:
+                await alert.add_reaction(FEEDBACK_CORRECT)
+                await alert.add_reaction(FEEDBACK_WRONG)
+            except Exception:
+                pass
             return
 
     try:
@@ -159,26 +305,21 @@ async def notify_moderators(bot, message, label, prob, action="flagged"):
 @commands.has_permissions(manage_messages=True)
 async def history(ctx, n: int = 5):
     """
-    DMs the last n log lines from logs/prism.log to the requesting moderator.
+    DMs the last n moderation events (from the in-memory recent-events buffer)
+    to the requesting moderator.
     Usage: !history or !history 10
     """
-    if not os.path.exists(LOG_FILE):
+    await startup.wait_ready()
+    last = list(reversed(await backend.history(n)))
+    if not last:
         await ctx.send("No logs found.")
         return
 
-    try:
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            lines = f.read().strip().splitlines()
-    except Exception as e:
-        await ctx.send(f"Failed to read logs: {e}")
-        return
-
-    if not lines:
-        await ctx.send("Log file empty.")
-        return
-
-    last = lines[-n:]
-    out = "\n\n".join(last)
+    out = "\n\n".join(
+        f"[{e['timestamp'][:19]}] {e['action'].upper()} {e['label']} (p={e['prob']:.2f}) — "
+        f"{e['user']} in {e['channel']}: {e['content'][:200]}"
+        for e in last
+    )
 
     try:
         await ctx.author.send(f"Last {len(last)} PRISM events:\n\n{out}")
@@ -206,9 +347,161 @@ async def dashboard(ctx):
         await ctx.send(file=discord.File(html_path))
 
 
+# Command 3: !scan — backfill moderation over channel history
+@bot.command(name="scan")
+@commands.has_permissions(manage_messages=True)
+async def scan(ctx, channel: discord.TextChannel, since: str = None, limit: int = None):
+    """
+    Rescans a channel's history and flags anything Prism would have flagged.
+    Without [since], resumes from the last checkpoint for that channel.
+    Usage: !scan #general, !scan #general 7d, !scan #general 2025-01-01 50000
+    """
+    if is_scanning(channel.id):
+        await ctx.send(f"A scan of {channel.mention} is already running.")
+        return
+
+    # allow "!scan #general 5000" as a bare limit
+    if since is not None and since.isdigit() and limit is None:
+        since, limit = None, int(since)
+
+    if since is not None:
+        try:
+            after = parse_since(since)
+        except ValueError:
+            await ctx.send("Couldn't parse [since] — use e.g. 7d, 12h or 2025-01-01.")
+            return
+    else:
+        cp = checkpoints.get(channel.id)
+        after = discord.Object(id=cp["after"]) if cp and cp.get("after") else None
+
+    await startup.wait_ready()
+    where = f"{channel.guild.name}/{channel.name}"
+
+    async def on_hit(message, label, prob):
+        if prob < FLAG_THRESHOLD or is_admin_member(message.author, channel):
+            return None
+        await backend.log({
+            # local time without offset, like live events
+            "timestamp": message.created_at.astimezone().replace(tzinfo=None).isoformat(),
+            "action": "flagged",
+            "user": str(message.author),
+            "user_id": message.author.id,
+            "channel": where,
+            "content": message.content,
+            "label": label,
+            "prob": prob
+        })
+        return "flagged"
+
+    status = await ctx.send(f"🔎 Scanning {channel.mention}…")
+
+    async def on_progress(summary):
+        await status.edit(content=(
+            f"🔎 Scanning {channel.mention}… {summary['scanned']} messages, "
+            f"{summary['flagged']} flagged"
+        ))
+
+    async def run():
+        try:
+            summary = await scan_channel(
+                channel, backend.scan_classifier(), after=after, limit=limit,
+                checkpoints=checkpoints, on_hit=on_hit, on_progress=on_progress,
+            )
+        except discord.Forbidden:
+            await ctx.send(f"I can't read the history of {channel.mention}.")
+            return
+        except Exception as e:
+            logging.exception("Scan of %s failed: %s", where, e)
+            await ctx.send(f"⚠️ Scan of {channel.mention} stopped: {e}. Run !scan again to resume.")
+            return
+
+        by_label = ", ".join(
+            f"{k.split(':', 1)[1]}: {v}" for k, v in summary.items() if k.startswith("label:")
+        ) or "none"
+        await status.edit(content=(
+            f"✅ Scan of {channel.mention} complete — {summary['scanned']} messages "
+            f"({summary['skipped']} skipped), {summary['flagged']} flagged ({by_label})."
+        ))
+
+    # run in the background so live moderation keeps going
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+# Command 5: !queues — per-guild moderation queue latency
+@bot.command(name="queues")
+@commands.has_permissions(manage_messages=True)
+async def queues(ctx):
+    """
+    Shows this server's moderation queue depth and queue latency, next to
+    the worst p95 across all servers, plus overload and permission-cache stats.
+    Usage: !queues
+    """
+    mine = scheduler.guild_stats(ctx.guild.id)
+    if mine is None:
+        await ctx.send("No messages have been queued for this server yet.")
+        return
+
+    worst = max((s["latency_p95"] for s in scheduler.stats().values()), default=0.0)
+    perms = perm_cache.stats()
+    await ctx.send(
+        f"📥 Queue for this server: {mine['queued']} waiting, {mine['running']} running, "
+        f"{mine['completed']} done, {mine['rejected']} rejected (max depth {mine['max_depth']})\n"
+        f"Latency: mean {mine['latency_mean'] * 1000:.0f} ms, p95 {mine['latency_p95'] * 1000:.0f} ms, "
+        f"max {mine['latency_max'] * 1000:.0f} ms — worst p95 across servers {worst * 1000:.0f} ms\n"
+        f"Overload mode: {overload.stats(ctx.guild.id)['level']} "
+        f"(global {overload.stats()['global_level']}, {overload.shed} messages shed)\n"
+        f"Permission cache: {perms['hit_rate']:.1%} hit rate ({perms['size']}/{perms['maxsize']} "
+        f"entries, {perms['evictions']} evicted, {perms['invalidations']} invalidated)"
+    )
+
+
+async def _known_labels():
+    try:
+        return await backend.labels()
+    except Exception:
+        return None
+
+
+# Command 4: !label — correct a decision for online learning
+@bot.command(name="label")
+@commands.has_permissions(manage_messages=True)
+async def label_message(ctx, message_id: int, label: str):
+    """
+    Records the correct label for a message Prism alerted on (or any message
+    in this channel) and queues it for online learning.
+    Usage: !label 123456789012345678 normal
+    """
+    await startup.wait_ready()
+    from model.online import learner as feedback_learner
+
+    label = label.lower()
+    classes = await _known_labels()
+    if classes is not None and label not in classes:
+        await ctx.send(f"Unknown label — use one of: {', '.join(classes)}")
+        return
+
+    alert = feedback_learner.lookup(message_id)
+    if alert is not None:
+        text = alert["text"]
+    else:
+        try:
+            text = (await ctx.channel.fetch_message(message_id)).content
+        except discord.NotFound:
+            await ctx.send("I can't find that message — use the ID from a PRISM alert.")
+            return
+
+    await backend.feedback(text, label, source="command", moderator=str(ctx.author))
+    await ctx.send(f"Thanks — recorded `{label}`. It will be applied in the next model update.")
+
+
 # Global error handler
 @history.error
 @dashboard.error
+@scan.error
+@label_message.error
+@queues.error
 async def command_error(ctx, error):
     if isinstance(error, commands.MissingPermissions):
         await ctx.send("You don’t have permission to use this command.")
@@ -0,0 +1,112 @@
+# model/compact.py
+"""
+Model compaction: drop TF-IDF features whose weight is negligible for every
+class, then rebuild a smaller vectorizer (same idf values, pruned
+vocabulary) and refit the classifier on the remaining columns.
+
+Features are selected either by magnitude (max |coef| across classes >=
+threshold) or by an L1-penalised fit (features with any non-zero weight,
+threshold used as C). report() measures size, load time, per-message
+latency and accuracy for several thresholds so an operating point can be
+chosen.
+"""
+import io
+import time
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+
+# Configuration
+COMPACT_THRESHOLDS = (0.05, 0.1, 0.2, 0.5, 1.0)   # magnitude thresholds to report
+COMPACT_L1_C = (1.0, 10.0, 100.0)                 # C values to report for method="l1"
+LATENCY_SAMPLES = 200
+
+
+def select_features(clf, X_train, y_train, method="magnitude", threshold=0.1):
+    """Indices of the features to keep, in ascending order."""
+    if method == "magnitude":
+        weight = np.abs(clf.coef_).max(axis=0)
+        return np.flatnonzero(weight >= threshold)
+    if method == "l1":
+        l1 = LogisticRegression(penalty="l1", solver="saga", C=threshold, max_iter=5000)
+        l1.fit(X_train, y_train)
+        return np.flatnonzero(np.abs(l1.coef_).max(axis=0) > 0)
+    raise ValueError(f"Unknown compaction method: {method}")
+
+
+def prune_vectorizer(tfidf, keep):
+    """A fitted TfidfVectorizer restricted to the kept vocabulary columns."""
+    terms = tfidf.get_feature_names_out()[keep]
+    params = tfidf.get_params()
+    params.update(vocabulary={term: i for i, term in enumerate(terms)}, max_features=None)
+    pruned = TfidfVectorizer(**params)
+    pruned.idf_ = tfidf.idf_[keep]
+    return pruned
+
+
+def compact(tfidf, clf, X_train, y_train, method="magnitude", threshold=0.1):
+    """
+    Returns a smaller (tfidf, clf) pair. X_train is the full training
+    matrix; its kept columns are re-normalised, which is exactly what the
+    pruned vectorizer produces, so no re-tokenising is needed.
+    """
+    keep = select_features(clf, X_train, y_train, method, threshold)
+    if keep.size == 0:
+        raise ValueError(f"threshold {threshold} prunes every feature")
+    small_tfidf = prune_vectorizer(tfidf, keep)
+    X_small = normalize(X_train[:, keep], norm=tfidf.norm) if tfidf.norm else X_train[:, keep]
+    small_clf = clone(clf).fit(X_small, y_train)
+    return small_tfidf, small_clf
+
+
+def measure(pipe, texts_test, y_test):
+    """Size, load time, single-message latency and accuracy of a pipeline."""
+    buf = io.BytesIO()
+    joblib.dump(pipe, buf)
+    size = buf.tell()
+
+    buf.seek(0)
+    t0 = time.perf_counter()
+    joblib.load(buf)
+    load_time = time.perf_counter() - t0
+
+    sample = (texts_test * (LATENCY_SAMPLES // max(len(texts_test), 1) + 1))[:LATENCY_SAMPLES]
+    t0 = time.perf_counter()
+    for text in sample:
+        pipe.predict_proba([text])
+    latency = (time.perf_counter() - t0) / max(len(sample), 1)
+
+    return {
+        "features": len(pipe.named_steps["tfidf"].vocabulary_),
+        "bytes": size,
+        "load_ms": load_time * 1000,
+        "latency_us": latency * 1e6,
+        "accuracy": float(np.mean(pipe.predict(texts_test) == np.asarray(y_test))),
+    }
+
+
+def report(tfidf, clf, X_train, y_train, texts_test, y_test, method="magnitude", thresholds=None):
+    """Prints before/after numbers for each threshold; returns the rows."""
+    if thresholds is None:
+        thresholds = COMPACT_THRESHOLDS if method == "magnitude" else COMPACT_L1_C
+
+    rows = [("full", measure(Pipeline([("tfidf", tfidf), ("clf", clf)]), texts_test, y_test))]
+    for threshold in thresholds:
+        try:
+            small = Pipeline(list(zip(("tfidf", "clf"),
+                                      compact(tfidf, clf, X_train, y_train, method, threshold))))
+        except ValueError as e:
+            print(f"  {method} {threshold}: {e}")
+            continue
+        rows.append((f"{method} {threshold}", measure(small, texts_test, y_test)))
+
+    print(f"{'model':>16} {'features':>9} {'size KB':>8} {'load ms':>8} {'lat us':>8} {'acc':>6}")
+    for name, m in rows:
+        print(f"{name:>16} {m['features']:>9} {m['bytes'] / 1024:>8.1f} {m['load_ms']:>8.1f} "
+              f"{m['latency_us']:>8.0f} {m['accuracy']:>6.3f}")
+    return rows
@@ -0,0 +1,129 @@
+# model/feature_cache.py
+"""
+On-disk cache for training: the cleaned corpus and the vectorized (sparse)
+feature matrices, so repeated training / tuning runs skip clean_text and
+TF-IDF fitting when nothing that affects them has changed.
+
+Entries live in .cache/features/<key>/ where key is a hash of everything
+the contents depend on (dataset bytes, CLEAN_TEXT_VERSION, vectorizer
+params, split settings). Least-recently-used and expired entries are
+evicted whenever a new entry is written.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+# Configuration
+FEATURE_CACHE_DIR = Path(".cache") / "features"
+FEATURE_CACHE_MAX_ENTRIES = 8
+FEATURE_CACHE_MAX_AGE_DAYS = 30
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_digest(*parts):
+    """Stable hash of JSON-serialisable parts (non-JSON values via str())."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FeatureCache:
+    def __init__(self, root=FEATURE_CACHE_DIR, max_entries=FEATURE_CACHE_MAX_ENTRIES,
+                 max_age_days=FEATURE_CACHE_MAX_AGE_DAYS):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+
+    def key(self, kind, *parts):
+        return f"{kind}-{content_digest(*parts)[:20]}"
+
+    def _dir(self, key):
+        return self.root / key
+
+    def has(self, key):
+        return (self._dir(key) / "complete").exists()
+
+    def _touch(self, key):
+        os.utime(self._dir(key) / "complete")
+
+    # ---- reads (None on miss) ----
+
+    def get_json(self, key, name):
+        if not self.has(key):
+            return None
+        with open(self._dir(key) / f"{name}.json", 'r', encoding='utf-8') as f:
+            value = json.load(f)
+        self._touch(key)
+        return value
+
+    def get_sparse(self, key, name):
+        if not self.has(key):
+            return None
+        import scipy.sparse
+        self._touch(key)
+        return scipy.sparse.load_npz(self._dir(key) / f"{name}.npz")
+
+    def get_object(self, key, name):
+        if not self.has(key):
+            return None
+        import joblib
+        self._touch(key)
+        return joblib.load(self._dir(key) / f"{name}.joblib")
+
+    # ---- writes ----
+
+    def put(self, key, json_items=None, sparse_items=None, objects=None):
+        """Writes a whole entry; it only becomes visible once complete."""
+        import joblib
+        import scipy.sparse
+
+        entry = self._dir(key)
+        tmp = entry.with_name(entry.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name, value in (json_items or {}).items():
+            with open(tmp / f"{name}.json", 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+        for name, matrix in (sparse_items or {}).items():
+            scipy.sparse.save_npz(tmp / f"{name}.npz", matrix, compressed=True)
+        for name, obj in (objects or {}).items():
+            joblib.dump(obj, tmp / f"{name}.joblib")
+        (tmp / "complete").touch()
+
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.rename(entry)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Drops expired entries, then the least recently used beyond max_entries."""
+        if not self.root.exists():
+            return []
+        entries = []
+        for d in self.root.iterdir():
+            marker = d / "complete"
+            if d.name == keep:
+                continue
+            if not marker.exists():
+                if d.name.endswith(".tmp"):
+                    shutil.rmtree(d, ignore_errors=True)
+                continue
+            entries.append((marker.stat().st_mtime, d))
+
+        now = time.time()
+        entries.sort(reverse=True)
+        removed = []
+        for i, (mtime, d) in enumerate(entries):
+            # `keep` takes one of the max_entries slots
+            if now - mtime > self.max_age or i >= self.max_entries - (keep is not None):
+                shutil.rmtree(d, ignore_errors=True)
+                removed.append(d.name)
+        return removed
@@ -0,0 +1,320 @@
+# model/online.py
+"""
+Online learning from moderator feedback.
+
+Moderator corrections (reactions on the mod-channel embed or !label) are
+appended to logs/feedback.jsonl and queued for a background worker. The
+worker applies them as mini-batch gradient steps to the live
+LogisticRegression coefficients (the TF-IDF vocabulary stays frozen),
+checks the candidate against the held-out split of the training data, and
+only swaps it in if accuracy has not dropped more than MAX_ACCURACY_DROP
+below the baseline of the originally trained model (recorded once in the
+manifest, so restarts don't loosen the guardrail). Accepted updates are
+periodically snapshotted as versioned artifacts listed in
+models/online_manifest.json, together with how many feedback.jsonl lines
+they cover; on start the rest of that file is replayed. The manifest
+records a digest of the trained model it derives from; once MODEL_PATH is
+retrained it is archived and online learning starts over from the new
+model (replaying all feedback onto it).
+"""
+import copy
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from config import MODEL_PATH
+from utils.preprocess import clean_text
+
+# Configuration
+FEEDBACK_LOG = Path("logs") / "feedback.jsonl"
+ONLINE_MANIFEST = os.path.join(os.path.dirname(MODEL_PATH), "online_manifest.json")
+MINI_BATCH = 16              # corrections per update
+FLUSH_INTERVAL = 60          # seconds before a partial batch is applied anyway
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-4
+EPOCHS = 3                   # gradient passes over each mini-batch
+MAX_ACCURACY_DROP = 0.01     # vs. held-out accuracy of the starting model
+SNAPSHOT_INTERVAL = 3600     # seconds between versioned snapshots
+TRACKED_ALERTS = 5000        # mod-channel alerts remembered for reactions
+
+
+def resolve_model_path():
+    """The latest published online snapshot of MODEL_PATH, or MODEL_PATH if there is none."""
+    try:
+        current = read_manifest().get("current")
+        if current and os.path.exists(current):
+            return current
+    except Exception as e:
+        print(f"Error reading online manifest: {e}")
+    return MODEL_PATH
+
+
+def read_manifest():
+    """
+    The manifest for the current MODEL_PATH. One written for a different
+    (older) trained model is archived and a fresh manifest returned.
+    """
+    from model.feature_cache import file_digest
+
+    base = file_digest(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+    if os.path.exists(ONLINE_MANIFEST):
+        with open(ONLINE_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("base_model") == base:
+            return manifest
+        archived = f"{os.path.splitext(ONLINE_MANIFEST)[0]}.{time.strftime('%Y%m%d-%H%M%S')}.json"
+        os.replace(ONLINE_MANIFEST, archived)
+        print(f"MODEL_PATH was retrained; archived online manifest to {archived}")
+    return {"current": None, "versions": [], "base_model": base}
+
+
+def write_manifest(manifest):
+    tmp = ONLINE_MANIFEST + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, ONLINE_MANIFEST)
+
+
+def sgd_update(clf, X, y, lr=LEARNING_RATE, l2=L2_PENALTY, epochs=EPOCHS):
+    """
+    In-place mini-batch gradient descent on a fitted LogisticRegression's
+    coef_ / intercept_ (softmax for multiclass, sigmoid for binary).
+    """
+    classes = list(clf.classes_)
+    idx = np.array([classes.index(label) for label in y])
+    n = X.shape[0]
+    W, b = clf.coef_, clf.intercept_
+
+    for _ in range(epochs):
+        Z = np.asarray(X @ W.T) + b
+        if W.shape[0] == 1:
+            P = 1.0 / (1.0 + np.exp(-Z))
+            G = P - (idx == 1).astype(float)[:, None]
+        else:
+            Z -= Z.max(axis=1, keepdims=True)
+            P = np.exp(Z)
+            P /= P.sum(axis=1, keepdims=True)
+            G = P
+            G[np.arange(n), idx] -= 1.0
+        W -= lr * (np.asarray(X.T @ G).T / n + l2 * W)
+        b -= lr * G.mean(axis=0)
+    return clf
+
+
+def load_holdout():
+    from model.train_model import load_data, split_data
+    _, X_test, _, y_test = split_data(load_data())
+    return X_test, y_test
+
+
+class OnlineLearner(threading.Thread):
+    def __init__(self):
+        super().__init__(name="prism-online-learner", daemon=True)
+        self.queue = queue.Queue()
+        self._alerts = OrderedDict()
+        self._lock = threading.Lock()
+        self.baseline_accuracy = None
+        self.accuracy = None
+        self.stats = {"received": 0, "applied": 0, "rejected": 0,
+                      "batches": 0, "snapshots": 0}
+        self._dirty = False
+        self._last_snapshot = time.monotonic()
+        self._next_seq = None        # feedback.jsonl line the next submission gets
+        self._consumed = 0           # feedback.jsonl lines processed so far
+
+    # ---- feedback capture (event-loop side) ----
+
+    def track(self, alert_id, message_id, text, label):
+        """Remember a mod-channel alert so reactions / !label can find its text."""
+        with self._lock:
+            record = {"text": text, "label": label}
+            self._alerts[alert_id] = record
+            self._alerts[message_id] = record
+            while len(self._alerts) > 2 * TRACKED_ALERTS:
+                self._alerts.popitem(last=False)
+
+    def lookup(self, message_id):
+        with self._lock:
+            return self._alerts.get(message_id)
+
+    def submit(self, text, label, source="", moderator=""):
+        """
+        Queue a correction. It is logged to disk first; anything not yet
+        covered by a snapshot is replayed from the log on the next start.
+        """
+        record = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "text": text,
+            "label": label,
+            "source": source,
+            "moderator": moderator,
+        }
+        with self._lock:
+            self._count_lines()
+            try:
+                with open(FEEDBACK_LOG, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                record["seq"] = self._next_seq
+                self._next_seq += 1
+            except Exception as e:
+                print(f"Error writing feedback log: {e}")
+            self.stats["received"] += 1
+            self.queue.put(record)
+
+    def _count_lines(self):
+        if self._next_seq is None:
+            self._next_seq = 0
+            if FEEDBACK_LOG.exists():
+                with open(FEEDBACK_LOG, 'r', encoding='utf-8') as f:
+                    self._next_seq = sum(1 for _ in f)
+
+    def unapplied_feedback(self, offset):
+        """
+        Feedback log lines from `offset` on (the ones no snapshot covers),
+        plus the line number where live submissions start.
+        """
+        with self._lock:
+            self._count_lines()
+            records = []
+            if FEEDBACK_LOG.exists():
+                with open(FEEDBACK_LOG, 'r', encoding='utf-8') as f:
+                    for seq, line in enumerate(f):
+                        if offset <= seq < self._next_seq:
+                            try:
+                                record = json.loads(line)
+                            except ValueError:
+                                continue
+                            record["seq"] = seq
+                            records.append(record)
+            return records, self._next_seq
+
+    def load_baseline(self, X_test, y_test):
+        """
+        Held-out accuracy of the originally trained model, computed once and
+        kept in the manifest.
+        """
+        import joblib
+
+        manifest = read_manifest()
+        if manifest.get("baseline_accuracy") is None:
+            manifest["baseline_accuracy"] = joblib.load(MODEL_PATH).score(X_test, y_test)
+            write_manifest(manifest)
+        return manifest["baseline_accuracy"]
+
+    # ---- background worker ----
+
+    def run(self):
+        from model import predict as live
+
+        X_test, y_test = load_holdout()
+        self.baseline_accuracy = self.load_baseline(X_test, y_test)
+        self.accuracy = live.load_model().score(X_test, y_test)
+
+        replay, live_from = self.unapplied_feedback(read_manifest().get("feedback_offset", 0))
+        if replay:
+            print(f"Replaying {len(replay)} feedback records not covered by a snapshot")
+        for i in range(0, len(replay), MINI_BATCH):
+            self._apply_logged(live, replay[i:i + MINI_BATCH], X_test, y_test)
+
+        batch = []
+        deadline = None
+        while True:
+            waits = []
+            if deadline is not None:
+                waits.append(deadline - time.monotonic())
+            if self._dirty:
+                waits.append(self._last_snapshot + SNAPSHOT_INTERVAL - time.monotonic())
+            timeout = max(min(waits), 0) if waits else None
+            try:
+                record = self.queue.get(timeout=timeout)
+                # already replayed from the log above
+                if record.get("seq") is None or record["seq"] >= live_from:
+                    batch.append(record)
+                    if deadline is None:
+                        deadline = time.monotonic() + FLUSH_INTERVAL
+            except queue.Empty:
+                pass
+
+            if batch and (len(batch) >= MINI_BATCH or time.monotonic() >= deadline):
+                self._apply_logged(live, batch, X_test, y_test)
+                batch, deadline = [], None
+
+            if self._dirty and time.monotonic() - self._last_snapshot >= SNAPSHOT_INTERVAL:
+                self.snapshot(live.load_model())
+
+    def _apply_logged(self, live, batch, X_test, y_test):
+        try:
+            self._apply(live, batch, X_test, y_test)
+        except Exception as e:
+            print(f"Error applying feedback batch: {e}")
+        seqs = [r["seq"] for r in batch if r.get("seq") is not None]
+        if seqs:
+            self._consumed = max(self._consumed, max(seqs) + 1)
+
+    def _apply(self, live, batch, X_test, y_test):
+        model = live.load_model()
+        tfidf, clf = model.named_steps['tfidf'], model.named_steps['clf']
+        known = set(clf.classes_)
+        batch = [r for r in batch if r["label"] in known]
+        if not batch:
+            return
+
+        candidate_clf = sgd_update(
+            copy.deepcopy(clf),
+            tfidf.transform([clean_text(r["text"]) for r in batch]),
+            [r["label"] for r in batch],
+        )
+        candidate = copy.copy(model)
+        candidate.steps = [("tfidf", tfidf), ("clf", candidate_clf)]
+        accuracy = candidate.score(X_test, y_test)
+
+        self.stats["batches"] += 1
+        if self.baseline_accuracy - accuracy > MAX_ACCURACY_DROP:
+            self.stats["rejected"] += len(batch)
+            print(f"Online update rejected: held-out accuracy {accuracy:.3f} "
+                  f"vs baseline {self.baseline_accuracy:.3f}")
+            return
+
+        live.set_model(candidate)
+        self.accuracy = accuracy
+        self.stats["applied"] += len(batch)
+        self._dirty = True
+
+    def snapshot(self, model):
+        """Writes a new versioned artifact and points the manifest at it."""
+        import joblib
+
+        manifest = read_manifest()
+        version = len(manifest["versions"]) + 1
+        base, ext = os.path.splitext(MODEL_PATH)
+        # keyed by the trained model too, so archived manifests' snapshots survive
+        path = f"{base}.{(manifest.get('base_model') or 'none')[:8]}.v{version}{ext}"
+        joblib.dump(model, path)
+
+        manifest["current"] = path
+        manifest["feedback_offset"] = self._consumed
+        manifest["versions"].append({
+            "version": version,
+            "path": path,
+            "accuracy": self.accuracy,
+            "baseline_accuracy": self.baseline_accuracy,
+            "feedback_applied": self.stats["applied"],
+            "created": datetime.datetime.now().isoformat(),
+        })
+        write_manifest(manifest)
+
+        self._dirty = False
+        self._last_snapshot = time.monotonic()
+        self.stats["snapshots"] += 1
+        print(f"Saved online model snapshot v{version} to {path}")
+        return path
+
+
+learner = OnlineLearner()
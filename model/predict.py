@@ -3,16 +3,21 @@ import joblib
 import os
 from config import MODEL_PATH
 from utils.preprocess import clean_text
+from model.prefilter import Prefilter
+from model.online import resolve_model_path
 
 _model = None
 _classes = None
+_prefilter = None
+_model_version = 0
 
 def load_model():
     global _model, _classes
     if _model is None:
         if not os.path.exists(MODEL_PATH):
             raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Train it first.")
-        _model = joblib.load(MODEL_PATH)
+        # prefer the latest snapshot published by online learning
+        _model = joblib.load(resolve_model_path())
         # sklearn pipeline has classes_ on the classifier step
         try:
             _classes = _model.named_steps['clf'].classes_
@@ -20,13 +25,90 @@ def load_model():
             _classes = None
     return _model
 
+def set_model(model):
+    """Swap in a new pipeline (used by online learning); takes effect on the next predict."""
+    global _model, _classes, _model_version
+    _classes = model.named_steps['clf'].classes_
+    _model = model
+    _model_version += 1
+
+def model_version():
+    """Bumped by every set_model, so copies of the model elsewhere can tell they're stale."""
+    return _model_version
+
+def load_prefilter():
+    global _prefilter
+    if _prefilter is None:
+        _prefilter = Prefilter.load()
+    return _prefilter
+
 def predict(text: str):
     """
     Returns: (label:str, prob:float) where prob is the probability for predicted label
+    Clear-cut messages are decided by the prefilter; the rest go to the model.
     """
-    model = load_model()
+    prefilter = load_prefilter()
     cleaned = clean_text(text)
+    decision = prefilter.decide(text, cleaned)
+    if decision is not None:
+        label, prob, tier = decision
+        prefilter.record(tier)
+        return label, prob
+
+    prefilter.record("model")
+    model = load_model()
     probs = model.predict_proba([cleaned])[0]  # array of probs
     pred_idx = probs.argmax()
     label = model.named_steps['clf'].classes_[pred_idx]
     return label, float(probs[pred_idx])
+
+
+def predict_cheap(text: str):
+    """
+    Prefilter-only scoring used under overload: (label, prob) when the
+    keyword/benign tiers can decide, otherwise None (the model is skipped).
+    """
+    prefilter = load_prefilter()
+    decision = prefilter.decide(text)
+    if decision is None:
+        prefilter.record("skipped")
+        return None
+    label, prob, tier = decision
+    prefilter.record(tier)
+    return label, prob
+
+def predict_batch(texts):
+    """
+    Batched predict(): prefilter each text, then score everything the
+    prefilter could not decide with a single predict_proba call.
+    Returns a list of (label, prob) in the same order as texts.
+    """
+    prefilter = load_prefilter()
+    results = [None] * len(texts)
+    pending_idx, pending = [], []
+    for i, text in enumerate(texts):
+        cleaned = clean_text(text)
+        decision = prefilter.decide(text, cleaned)
+        if decision is not None:
+            label, prob, tier = decision
+            prefilter.record(tier)
+            results[i] = (label, prob)
+        else:
+            prefilter.record("model")
+            pending_idx.append(i)
+            pending.append(cleaned)
+
+    if pending:
+        for i, result in zip(pending_idx, predict_model_batch(pending)):
+            results[i] = result
+    return results
+
+def predict_model_batch(cleaned_texts):
+    """Model-only scoring of already-cleaned texts (no prefilter)."""
+    model = load_model()
+    classes = model.named_steps['clf'].classes_
+    results = []
+    for probs in model.predict_proba(cleaned_texts):
+        pred_idx = probs.argmax()
+        results.append((classes[pred_idx], float(probs[pred_idx])))
+    return results
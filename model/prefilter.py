@@ -0,0 +1,264 @@
+# model/prefilter.py
+"""
+Cheap first tier in front of the TF-IDF + LogisticRegression model.
+
+Clear-cut messages are decided here in microseconds:
+  * "keyword" tier - an Aho-Corasick automaton over known spam/scam phrases,
+    plus invite/URL patterns on the raw text
+  * "benign" tier - short messages built only from known-safe words,
+    learned from the normal rows of the training data
+Anything else returns None and is sent to the model.
+"""
+import json
+import os
+import re
+from collections import Counter, deque
+
+from config import DATA_PATH, MODEL_PATH
+from utils.preprocess import clean_text
+
+# Configuration
+PREFILTER_RULES_PATH = os.path.join(os.path.dirname(MODEL_PATH), "prefilter_rules.json")
+KEYWORD_MIN_HITS = 2        # non-overlapping phrases needed before the keyword tier decides
+KEYWORD_CONFIDENCE = 0.9
+SHORT_MAX_TOKENS = 6        # benign tier only looks at messages this short
+BENIGN_CONFIDENCE = 0.95
+MIN_TOKEN_SUPPORT = 3       # rows a token must appear in to be learned as safe
+
+SPAM_PHRASES = [
+    "free nitro", "free giveaway", "free giveaways", "free followers",
+    "click here", "click this link", "join our server", "join now",
+    "subscribe now", "limited offer", "don't miss out", "amazing deal",
+]
+SCAM_PHRASES = [
+    "verify here", "share your password", "upi id",
+    "transfer money", "you've won", "free iphone", "discord staff",
+    "gift card", "seed phrase", "double your money", "click the link",
+]
+# words that usually mean the phrases are being warned about, not used
+WARNING_WORDS = {"never", "not", "don", "dont", "beware", "careful", "scam", "scams", "fake"}
+
+INVITE_RE = re.compile(r"(discord\.gg|discord(?:app)?\.com/invite)/\S+", re.IGNORECASE)
+URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+
+# everyday chat that is safe on its own
+BASE_SAFE_TOKENS = {
+    "lol", "lmao", "haha", "xd", "gg", "wp", "ok", "okay", "k", "kk", "ty",
+    "thx", "thanks", "thank", "np", "yes", "yeah", "yep", "no", "nah", "sure",
+    "hi", "hello", "hey", "yo", "bye", "gn", "gm", "brb", "afk", "nice", "cool",
+    "see", "you", "later", "soon", "good", "morning", "night", "same", "true",
+}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every pattern in one pass over the text."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, pattern, value):
+        """Adds a pattern; its value is yielded for every occurrence."""
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+
+    def search(self, text):
+        """Yields the value of every pattern occurrence in text."""
+        for _, _, value in self.matches(text):
+            yield value
+
+    def matches(self, text):
+        """Yields (start, end, value) for every pattern occurrence in text."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
+
+
+def _build_automaton():
+    automaton = KeywordAutomaton()
+    for label, phrases in (("spam", SPAM_PHRASES), ("scam", SCAM_PHRASES)):
+        for phrase in phrases:
+            # match on the same normalised form the model sees, word-bounded
+            key = clean_text(phrase)
+            automaton.add(f" {key} ", (label, key))
+    automaton.build()
+    return automaton
+
+
+def _non_overlapping(matches):
+    """Leftmost-longest matches that don't share any characters."""
+    chosen, last_end = [], 0
+    for start, end, value in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+        if start >= last_end:
+            chosen.append(value)
+            last_end = end
+    return chosen
+
+
+def learn_rules(texts, labels):
+    """
+    Learns the benign fast path from cleaned, labeled training rows:
+    short messages only ever labeled normal, and tokens that only occur in
+    normal rows.
+    """
+    message_labels = {}
+    token_labels = {}
+    token_support = Counter()
+    for text, label in zip(texts, labels):
+        tokens = text.split()
+        if 0 < len(tokens) <= SHORT_MAX_TOKENS:
+            message_labels.setdefault(text, set()).add(label)
+        for tok in set(tokens):
+            token_labels.setdefault(tok, set()).add(label)
+            token_support[tok] += 1
+
+    safe_messages = sorted(m for m, ls in message_labels.items() if ls == {"normal"})
+    safe_tokens = sorted(
+        t for t, ls in token_labels.items()
+        if ls == {"normal"} and token_support[t] >= MIN_TOKEN_SUPPORT
+    )
+    return {"version": 1, "safe_messages": safe_messages, "safe_tokens": safe_tokens}
+
+
+def save_rules(rules, path=PREFILTER_RULES_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rules, f, indent=2)
+
+
+class Prefilter:
+    def __init__(self, rules=None):
+        rules = rules or {}
+        self.automaton = _build_automaton()
+        self.safe_messages = frozenset(rules.get("safe_messages", ()))
+        self.safe_tokens = frozenset(BASE_SAFE_TOKENS | set(rules.get("safe_tokens", ())))
+        self.counts = Counter()
+
+    @classmethod
+    def load(cls, path=PREFILTER_RULES_PATH):
+        rules = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                rules = json.load(f)
+        return cls(rules)
+
+    def decide(self, text, cleaned=None):
+        """
+        Returns (label, prob, tier) for clear-cut messages, or None when the
+        message has to go to the model.
+        """
+        if cleaned is None:
+            cleaned = clean_text(text)
+
+        # phrases are padded with spaces; trim them so adjacent phrases don't
+        # count as overlapping, while a phrase inside a longer one does
+        padded = self.automaton.matches(f" {cleaned} ")
+        hits = {"spam": set(), "scam": set()}
+        # tokens outside the matched phrases ("don" in "don't miss out" is the phrase's own)
+        outside = Counter(cleaned.split())
+        for label, key in _non_overlapping((s + 1, e - 1, v) for s, e, v in padded):
+            hits[label].add(key)
+            outside.subtract(key.split())
+        if INVITE_RE.search(text):
+            hits["spam"].add("<invite>")
+        has_url = URL_RE.search(text) is not None
+
+        spam, scam = len(hits["spam"]), len(hits["scam"])
+        if (spam or scam) and any(outside[w] > 0 for w in WARNING_WORDS):
+            # "never share your password" - let the model read it
+            return None
+        if scam >= KEYWORD_MIN_HITS and not spam:
+            return "scam", KEYWORD_CONFIDENCE, "keyword"
+        if spam >= KEYWORD_MIN_HITS and not scam:
+            return "spam", KEYWORD_CONFIDENCE, "keyword"
+        if spam or scam or has_url:
+            return None
+
+        if cleaned in self.safe_messages:
+            return "normal", BENIGN_CONFIDENCE, "benign"
+        tokens = cleaned.split()
+        if 0 < len(tokens) <= SHORT_MAX_TOKENS and all(t in self.safe_tokens for t in tokens):
+            return "normal", BENIGN_CONFIDENCE, "benign"
+        return None
+
+    def record(self, tier):
+        self.counts[tier] += 1
+
+    def stats(self):
+        """How often each tier ("keyword", "benign", "model") made the decision."""
+        total = sum(self.counts.values())
+        return {
+            tier: {"count": n, "share": n / total if total else 0.0}
+            for tier, n in self.counts.items()
+        }
+
+
+def evaluate(path=DATA_PATH):
+    """
+    Decision rate and precision of each tier on the held-out split, with
+    benign rules learned from the training split only (same split as
+    train_model).
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from model.train_model import SPLIT_PARAMS
+
+    df = pd.read_csv(path).dropna(subset=["text", "label"])
+    texts_train, texts_test, y_train, y_test = train_test_split(
+        df["text"].astype(str).tolist(), df["label"].tolist(),
+        stratify=df["label"].tolist(), **SPLIT_PARAMS)
+    prefilter = Prefilter(learn_rules([clean_text(t) for t in texts_train], y_train))
+    decided = Counter()
+    correct = Counter()
+    for text, label in zip(texts_test, y_test):
+        decision = prefilter.decide(text)
+        if decision is None:
+            continue
+        decided[decision[2]] += 1
+        correct[decision[2]] += decision[0] == label
+
+    total = len(texts_test)
+    print(f"Held-out rows: {total}")
+    for tier in ("keyword", "benign"):
+        n = decided[tier]
+        precision = correct[tier] / n if n else float("nan")
+        print(f"{tier:>8}: decided {n} ({n / total:.1%}), precision {precision:.3f}")
+    rest = total - sum(decided.values())
+    print(f"{'model':>8}: {rest} ({rest / total:.1%})")
+    return decided, correct
+
+
+if __name__ == "__main__":
+    evaluate()
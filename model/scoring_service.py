@@ -0,0 +1,517 @@
+# model/scoring_service.py
+"""
+Shared scoring service for the sharded (multi-process) deployment.
+
+One service process holds the only copy of the model and owns all event
+logging; shard processes talk to it over a Unix socket with
+length-prefixed JSON frames. Shards clean text and run the prefilter
+themselves, so only messages the prefilter can't decide are sent for model
+scoring. The service micro-batches concurrent requests from all shards
+into predict_proba calls and runs up to SCORE_WORKERS of them at once in
+worker processes forked at startup, after the model is loaded and before
+any other thread exists, so they share it copy-on-write. They are never
+re-forked: online-learning updates reach them through shared memory.
+Log writes are applied one at a time on a single thread, so events from
+every shard land safely in the same files.
+
+Run it with:  python -m model.scoring_service [--socket PATH]
+(shards.py starts it for you). Single-process bot.py uses LocalBackend,
+which has the same interface and does everything in-process.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Configuration
+SCORING_SOCKET = os.environ.get("PRISM_SCORING_SOCKET", "")
+DEFAULT_SOCKET_PATH = "/tmp/prism-scoring.sock"
+SCORE_BATCH_MAX = 256          # texts per predict_proba call
+SCORE_BATCH_WINDOW = 0.002     # seconds to wait for more requests to batch
+SCORE_WORKERS = int(os.environ.get("PRISM_SCORE_WORKERS", os.cpu_count() or 1))
+CLIENT_TIMEOUT = 30.0
+CLIENT_CONNECT_RETRIES = 50
+
+_HEADER = struct.Struct("!I")
+
+
+async def _read_frame(reader):
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(size))
+
+
+def _write_frame(writer, obj):
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    writer.write(_HEADER.pack(len(data)) + data)
+
+
+class SharedCoefficients:
+    """
+    A linear classifier's coef_/intercept_ in shared memory, so forked
+    scoring workers pick up online-learning updates (which only change
+    those arrays) without being re-forked. Writes are bracketed by a
+    sequence counter that is odd while a write is in progress; readers
+    retry until they copy a consistent version.
+    """
+
+    def __init__(self, clf, ctx):
+        self._shapes = (clf.coef_.shape, clf.intercept_.shape)
+        self._coef = ctx.RawArray("d", clf.coef_.size)
+        self._intercept = ctx.RawArray("d", clf.intercept_.size)
+        self._seq = ctx.RawValue("Q", 0)
+        self.publish(clf)
+        self._seen = self._seq.value
+
+    def _views(self):
+        import numpy as np
+        coef_shape, intercept_shape = self._shapes
+        return (np.frombuffer(self._coef, dtype=np.float64).reshape(coef_shape),
+                np.frombuffer(self._intercept, dtype=np.float64).reshape(intercept_shape))
+
+    def publish(self, clf):
+        """Service side: makes clf's coefficients the ones every worker scores with."""
+        coef, intercept = self._views()
+        self._seq.value += 1
+        coef[...] = clf.coef_
+        intercept[...] = clf.intercept_
+        self._seq.value += 1
+
+    def refresh(self, clf):
+        """Worker side: copies newer published coefficients into clf in place."""
+        if self._seq.value == self._seen:
+            return
+        import numpy as np
+        coef, intercept = self._views()
+        while True:
+            seq = self._seq.value
+            if seq % 2:
+                continue
+            np.copyto(clf.coef_, coef)
+            np.copyto(clf.intercept_, intercept)
+            if self._seq.value == seq:
+                self._seen = seq
+                return
+
+
+_worker_shared = None   # the SharedCoefficients, in scoring worker processes
+
+
+def _init_worker(shared):
+    global _worker_shared
+    _worker_shared = shared
+
+
+def start_score_workers(workers, clf):
+    """
+    Forks `workers` scoring processes sharing the already-loaded model, and
+    returns (executor, SharedCoefficients) for the ScoringServer.
+
+    Call it before starting any other thread: fork copies only the calling
+    thread, so a lock another thread holds at that moment (logging, queues,
+    the learner) stays locked forever in the child. With the fork context
+    ProcessPoolExecutor forks every worker on the first submit, before its
+    own manager thread starts, so the workers are complete when this
+    returns and the pool never forks again. Native BLAS threads are not
+    Python threads: OpenBLAS (numpy's default) stops them around fork; with
+    another BLAS build set OMP_NUM_THREADS=1 for the service.
+    """
+    others = [t.name for t in threading.enumerate() if t is not threading.current_thread()]
+    if others:
+        logging.warning("Forking scoring workers while other threads run: %s", ", ".join(others))
+    ctx = multiprocessing.get_context("fork")
+    shared = SharedCoefficients(clf, ctx)
+    executor = ProcessPoolExecutor(workers, mp_context=ctx,
+                                   initializer=_init_worker, initargs=(shared,))
+    executor.submit(int).result()
+    return executor, shared
+
+
+def score_in_worker(cleaned_texts):
+    """classify for worker processes: predict_model_batch with the latest published coefficients."""
+    from model.predict import load_model, predict_model_batch
+    _worker_shared.refresh(load_model().named_steps['clf'])
+    return predict_model_batch(cleaned_texts)
+
+
+def record_event(event):
+    """Writes one moderation event to the logger and the report dashboard."""
+    from utils.logger import log_event
+    from utils.report_generator import add_to_report
+
+    log_event(event)
+    add_to_report(event.get("content", ""), event.get("user", "unknown"),
+                  event.get("channel", "unknown"), event.get("label", "unknown"),
+                  event.get("prob", 0))
+
+
+def recent_history(n):
+    """The newest n logged events (newest first) as dicts."""
+    from utils.logger import recent_events
+    return [record.to_dict() for record in recent_events.latest(n)]
+
+
+class ScoringServer:
+    def __init__(self, path, classify, log=None, feedback=None, labels=None, history=None,
+                 workers=1, executor=None, model_version=None, on_model_change=None):
+        """
+        classify(cleaned_texts) -> [(label, prob)]   model-only scoring
+        log(event)                                    serialised event logging
+        feedback(text, label, source, moderator)      online-learning queue
+        labels() -> [str]                             known labels
+        history(n) -> [event dict]                    newest n logged events
+        workers                                       concurrent classify calls
+        executor                                      runs classify calls (default: a thread
+                                                      per worker); from start_score_workers
+                                                      for worker processes, in which case
+                                                      classify must be a module-level function
+        model_version() -> int                        checked before each batch; when it has
+        on_model_change()                             changed, this is called first (e.g. to
+                                                      publish new SharedCoefficients)
+        """
+        self.path = path
+        self.classify = classify
+        self.log = log or record_event
+        self.feedback = feedback
+        self.labels = labels
+        self.history = history or recent_history
+        self.workers = max(1, workers)
+        self.model_version = model_version or (lambda: 0)
+        self.on_model_change = on_model_change
+        self._published_version = self.model_version()
+        self._score_executor = executor or ThreadPoolExecutor(max_workers=self.workers,
+                                                              thread_name_prefix="prism-score")
+        self._slots = None
+        self._log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prism-log")
+        self._pending = deque()
+        self._wakeup = None
+        self._server = None
+        self._tasks = set()
+        self.stats = {"connections": 0, "requests": 0, "texts": 0, "batches": 0, "logged": 0,
+                      "workers": self.workers}
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._spawn(self._batcher())
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        self._score_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                request = await _read_frame(reader)
+                self._spawn(self._dispatch(request, writer))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request, writer):
+        self.stats["requests"] += 1
+        response = {"id": request.get("id")}
+        try:
+            op = request["op"]
+            if op == "score":
+                response["result"] = await self._score(request["texts"])
+            elif op == "log":
+                await asyncio.get_running_loop().run_in_executor(
+                    self._log_executor, self.log, request["event"])
+                self.stats["logged"] += 1
+                response["result"] = None
+            elif op == "feedback":
+                self.feedback(**request["feedback"])
+                response["result"] = None
+            elif op == "labels":
+                response["result"] = self.labels()
+            elif op == "history":
+                response["result"] = await asyncio.get_running_loop().run_in_executor(
+                    self._log_executor, self.history, request["n"])
+            elif op == "stats":
+                response["result"] = self.stats
+            else:
+                raise ValueError(f"unknown op {op!r}")
+        except Exception as e:
+            logging.exception("Scoring service request failed: %s", e)
+            response["error"] = str(e)
+        _write_frame(writer, response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _score(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((texts, future))
+        self._wakeup.set()
+        return await future
+
+    async def _batcher(self):
+        while True:
+            await self._wakeup.wait()
+            # a free worker first, so requests keep piling into the next
+            # batch while every worker is busy
+            await self._slots.acquire()
+            await asyncio.sleep(SCORE_BATCH_WINDOW)
+            self._wakeup.clear()
+
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= SCORE_BATCH_MAX):
+                texts, future = self._pending.popleft()
+                batch.append((texts, future))
+                size += len(texts)
+            if self._pending:
+                self._wakeup.set()
+            if not batch:
+                self._slots.release()
+                continue
+            self._spawn(self._run_batch(batch))
+
+    def _check_model(self):
+        version = self.model_version()
+        if version != self._published_version:
+            if self.on_model_change is not None:
+                self.on_model_change()
+            self._published_version = version
+
+    async def _run_batch(self, batch):
+        flat = [t for texts, _ in batch for t in texts]
+        try:
+            self._check_model()
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._score_executor, self.classify, flat)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.stats["batches"] += 1
+        self.stats["texts"] += len(flat)
+        offset = 0
+        for texts, future in batch:
+            chunk = results[offset:offset + len(texts)]
+            offset += len(texts)
+            if not future.done():
+                future.set_result([[str(label), float(prob)] for label, prob in chunk])
+
+
+class ScoringClient:
+    """Shard-side connection to the scoring service (same interface as LocalBackend)."""
+
+    def __init__(self, path=SCORING_SOCKET or DEFAULT_SOCKET_PATH):
+        self.path = path
+        self._ids = itertools.count(1)
+        self._waiting = {}
+        self._writer = None
+        self._reader_task = None
+        self._connect_lock = None
+
+    async def _ensure_connected(self):
+        if self._writer is not None:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            for attempt in range(CLIENT_CONNECT_RETRIES):
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                    break
+                except (FileNotFoundError, ConnectionError):
+                    if attempt == CLIENT_CONNECT_RETRIES - 1:
+                        raise
+                    await asyncio.sleep(0.2)
+            self._writer = writer
+            self._reader_task = asyncio.get_running_loop().create_task(self._read_responses(reader))
+
+    async def _read_responses(self, reader):
+        error = None
+        try:
+            while True:
+                response = await _read_frame(reader)
+                future = self._waiting.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(RuntimeError(response["error"]))
+                else:
+                    future.set_result(response.get("result"))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = e
+        finally:
+            self._writer = None
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"scoring service disconnected: {error}"))
+        self._waiting.clear()
+
+    async def _call(self, op, **payload):
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        _write_frame(self._writer, {"id": request_id, "op": op, **payload})
+        await self._writer.drain()
+        try:
+            return await asyncio.wait_for(future, CLIENT_TIMEOUT)
+        finally:
+            self._waiting.pop(request_id, None)
+
+    async def score(self, texts):
+        """Prefilter locally; send only undecided (cleaned) texts to the service."""
+        from model.predict import load_prefilter
+        from utils.preprocess import clean_text
+
+        prefilter = load_prefilter()
+        results = [None] * len(texts)
+        pending_idx, pending = [], []
+        for i, text in enumerate(texts):
+            cleaned = clean_text(text)
+            decision = prefilter.decide(text, cleaned)
+            if decision is not None:
+                prefilter.record(decision[2])
+                results[i] = decision[:2]
+            else:
+                prefilter.record("model")
+                pending_idx.append(i)
+                pending.append(cleaned)
+        if pending:
+            for i, (label, prob) in zip(pending_idx, await self._call("score", texts=pending)):
+                results[i] = (label, prob)
+        return results
+
+    async def log(self, event):
+        await self._call("log", event=event)
+
+    async def feedback(self, text, label, source="", moderator=""):
+        await self._call("feedback", feedback={"text": text, "label": label,
+                                               "source": source, "moderator": moderator})
+
+    async def labels(self):
+        return await self._call("labels")
+
+    async def history(self, n):
+        return await self._call("history", n=n)
+
+    async def stats(self):
+        return await self._call("stats")
+
+    def scan_classifier(self):
+        """Classifier for utils.scanner: awaited, scored by the service."""
+        return self.score
+
+
+class LocalBackend:
+    """
+    Single-process backend: scoring, logging and feedback all in this process.
+    Log writes go to one writer thread, as in the service, so file I/O never
+    blocks the event loop.
+    """
+
+    def __init__(self):
+        self._log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prism-log")
+
+    async def score(self, texts):
+        from model.predict import predict_batch
+        return await asyncio.get_running_loop().run_in_executor(None, predict_batch, texts)
+
+    async def log(self, event):
+        await asyncio.get_running_loop().run_in_executor(self._log_executor, record_event, event)
+
+    async def feedback(self, text, label, source="", moderator=""):
+        from model.online import learner
+        learner.submit(text, label, source=source, moderator=moderator)
+
+    async def labels(self):
+        from model.predict import load_model
+        return [str(c) for c in load_model().named_steps['clf'].classes_]
+
+    async def history(self, n):
+        return await asyncio.get_running_loop().run_in_executor(self._log_executor, recent_history, n)
+
+    def scan_classifier(self):
+        """Classifier for utils.scanner: synchronous, so it runs on the scan worker thread."""
+        from model.predict import predict_batch
+        return predict_batch
+
+
+def get_backend():
+    """ScoringClient when PRISM_SCORING_SOCKET is set (sharded mode), else LocalBackend."""
+    return ScoringClient(SCORING_SOCKET) if SCORING_SOCKET else LocalBackend()
+
+
+async def _serve(path):
+    from utils import startup
+    from model.online import learner
+    from model.predict import predict_model_batch, load_model, model_version
+
+    # fork the scoring workers first, while this is the only thread
+    # (warm-up, the learner and the executors all start below)
+    executor = shared = None
+    if SCORE_WORKERS > 1:
+        executor, shared = start_score_workers(SCORE_WORKERS, load_model().named_steps['clf'])
+
+    await startup.wait_ready()
+    logging.info(startup.format_report())
+    learner.start()
+
+    server = ScoringServer(
+        path,
+        classify=score_in_worker if executor else predict_model_batch,
+        log=record_event,
+        feedback=learner.submit,
+        labels=lambda: [str(c) for c in load_model().named_steps['clf'].classes_],
+        workers=SCORE_WORKERS,
+        executor=executor,
+        model_version=model_version,
+        on_model_change=shared and (lambda: shared.publish(load_model().named_steps['clf'])),
+    )
+    await server.start()
+    print(f"PRISM scoring service listening on {path} ({server.workers} scoring workers)", flush=True)
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import signal
+    import sys
+
+    # shards.py stops the service with SIGTERM; shut down like Ctrl-C so
+    # the scoring worker processes are cleaned up too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    logging.basicConfig(level=logging.INFO)
+    path = SCORING_SOCKET or DEFAULT_SOCKET_PATH
+    if "--socket" in sys.argv:
+        path = sys.argv[sys.argv.index("--socket") + 1]
+    try:
+        asyncio.run(_serve(path))
+    except KeyboardInterrupt:
+        pass
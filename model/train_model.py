@@ -13,44 +13,131 @@ from sklearn.metrics import classification_report, accuracy_score
 import joblib
 
 from config import DATA_PATH, MODEL_PATH
-from utils.preprocess import clean_text
+from utils.preprocess import clean_text, CLEAN_TEXT_VERSION
+from model.feature_cache import FeatureCache, file_digest, content_digest
+from model.compact import compact, report as compaction_report
+from model.prefilter import learn_rules, save_rules, PREFILTER_RULES_PATH
 
 
-def load_data(path=DATA_PATH):
+TFIDF_PARAMS = {"ngram_range": (1, 2), "max_features": 5000}
+SPLIT_PARAMS = {"test_size": 0.15, "random_state": 42}
+
+
+def load_data(path=DATA_PATH, cache=None):
+    """Cleaned corpus; with a FeatureCache, CSV parsing and clean_text are skipped on a hit."""
+    if cache is not None:
+        key = cache.key("corpus", file_digest(path), CLEAN_TEXT_VERSION)
+        corpus = cache.get_json(key, "corpus")
+        if corpus is not None:
+            return pd.DataFrame(corpus)
+
     df = pd.read_csv(path)
     # expect columns: text,label
     df = df.dropna(subset=["text", "label"])
     df["text"] = df["text"].astype(str).apply(clean_text)
+
+    if cache is not None:
+        cache.put(key, json_items={"corpus": {"text": df["text"].tolist(),
+                                              "label": df["label"].tolist()}})
     return df
 
 
-def train_and_save():
-    df = load_data()
+def split_data(df):
+    """Train/held-out split shared by training and the online-learning guardrail."""
     X = df["text"].tolist()
     y = df["label"].tolist()
+    return train_test_split(X, y, stratify=y, **SPLIT_PARAMS)
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.15, random_state=42, stratify=y
-    )
 
-    pipe = Pipeline([
-        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=5000)),
-        ("clf", LogisticRegression(max_iter=1000))
-    ])
+def vectorize(df, cache=None):
+    """
+    Splits the corpus and fits TF-IDF on the training part.
+    Returns (tfidf, X_train, X_test, y_train, y_test) with sparse X matrices;
+    cached by corpus content, vectorizer params and split settings.
+    """
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+    if cache is not None:
+        key = cache.key("features", content_digest(df["text"].tolist(), df["label"].tolist()),
+                        tfidf.get_params(), SPLIT_PARAMS)
+        if cache.has(key):
+            labels = cache.get_json(key, "labels")
+            return (cache.get_object(key, "tfidf"),
+                    cache.get_sparse(key, "X_train"), cache.get_sparse(key, "X_test"),
+                    labels["train"], labels["test"])
+
+    texts_train, texts_test, y_train, y_test = split_data(df)
+    X_train = tfidf.fit_transform(texts_train)
+    X_test = tfidf.transform(texts_test)
+
+    if cache is not None:
+        cache.put(key,
+                  json_items={"labels": {"train": y_train, "test": y_test}},
+                  sparse_items={"X_train": X_train, "X_test": X_test},
+                  objects={"tfidf": tfidf})
+    return tfidf, X_train, X_test, y_train, y_test
+
+
+def train_and_save(use_cache=True, compact_method=None, compact_threshold=None):
+    """
+    compact_method ("magnitude" or "l1") prints a compaction report;
+    with compact_threshold as well, the compacted model is the one saved.
+    """
+    cache = FeatureCache() if use_cache else None
+    df = load_data(cache=cache)
+
+    tfidf, X_train, X_test, y_train, y_test = vectorize(df, cache=cache)
 
     print("Training model...")
-    pipe.fit(X_train, y_train)
-    preds = pipe.predict(X_test)
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit(X_train, y_train)
+    pipe = Pipeline([
+        ("tfidf", tfidf),
+        ("clf", clf)
+    ])
+    preds = clf.predict(X_test)
 
     print("Accuracy:", accuracy_score(y_test, preds))
     print("Classification report:")
     print(classification_report(y_test, preds))
 
+    texts_train, texts_test, _, _ = split_data(df)
+
+    if compact_method:
+        print("Compaction report:")
+        compaction_report(tfidf, clf, X_train, y_train, texts_test, y_test, method=compact_method)
+        if compact_threshold is not None:
+            small_tfidf, small_clf = compact(tfidf, clf, X_train, y_train,
+                                             compact_method, compact_threshold)
+            pipe = Pipeline([
+                ("tfidf", small_tfidf),
+                ("clf", small_clf)
+            ])
+            print(f"Using compacted model ({compact_method} {compact_threshold}): "
+                  f"{len(small_tfidf.vocabulary_)} of {len(tfidf.vocabulary_)} features, "
+                  f"accuracy {accuracy_score(y_test, pipe.predict(texts_test)):.3f}")
+
     # ensure models directory exists
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
     joblib.dump(pipe, MODEL_PATH)
     print(f"Saved model pipeline to {MODEL_PATH}")
 
+    # benign fast-path rules for the prefilter tier, from the training split only
+    save_rules(learn_rules(texts_train, y_train))
+    print(f"Saved prefilter rules to {PREFILTER_RULES_PATH}")
+
+
+def _compact_args(argv):
+    """--compact / --compact-l1 report; --compact=0.1 / --compact-l1=10 also save."""
+    for arg in argv:
+        for flag, method in (("--compact-l1", "l1"), ("--compact", "magnitude")):
+            if arg == flag:
+                return method, None
+            if arg.startswith(flag + "="):
+                return method, float(arg.split("=", 1)[1])
+    return None, None
+
 
 if __name__ == "__main__":
-    train_and_save()
+    method, threshold = _compact_args(sys.argv[1:])
+    train_and_save(use_cache="--no-cache" not in sys.argv,
+                   compact_method=method, compact_threshold=threshold)
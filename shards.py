@@ -0,0 +1,139 @@
+# shards.py
+"""
+Runs PRISM as several Discord shards in separate processes.
+
+One scoring service process (model/scoring_service.py) holds the model and
+writes all logs; each shard is a normal bot.py process told its shard id
+and the service socket through environment variables.
+
+  python shards.py --shards 4 [--socket PATH]
+  python shards.py --simulate --shards 4 [--messages 20000] [--model-only]
+
+--simulate replaces the Discord gateway with local worker processes that
+replay the dataset through the scoring service, and prints messages/second
+so throughput can be compared across shard counts. --model-only skips the
+shard-side prefilter so every message reaches the model, which isolates
+the service's own scaling (set PRISM_SCORE_WORKERS to compare).
+"""
+import asyncio
+import csv
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from model.scoring_service import DEFAULT_SOCKET_PATH, ScoringClient
+from utils.preprocess import clean_text
+
+# Configuration
+SIM_DATA_PATH = os.path.join("data", "dataset_1000.csv")
+SIM_MESSAGES = 20000            # messages replayed across all simulated shards
+SIM_IN_FLIGHT = 32              # concurrent messages per simulated shard
+SERVICE_START_TIMEOUT = 120.0   # seconds to wait for the scoring socket
+
+
+def start_service(socket_path):
+    proc = subprocess.Popen([sys.executable, "-m", "model.scoring_service", "--socket", socket_path])
+    deadline = time.monotonic() + SERVICE_START_TIMEOUT
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None:
+            raise RuntimeError("scoring service exited during startup")
+        if time.monotonic() > deadline:
+            proc.terminate()
+            raise RuntimeError("scoring service did not start in time")
+        time.sleep(0.2)
+    return proc
+
+
+def run_shards(count, socket_path):
+    service = start_service(socket_path)
+    shards = []
+    for shard_id in range(count):
+        env = dict(os.environ, PRISM_SHARD_ID=str(shard_id), PRISM_SHARD_COUNT=str(count),
+                   PRISM_SCORING_SOCKET=socket_path)
+        shards.append(subprocess.Popen([sys.executable, "bot.py"], env=env))
+    print(f"PRISM running {count} shards against {socket_path}")
+
+    try:
+        while service.poll() is None and all(p.poll() is None for p in shards):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nShutting down shards...")
+    finally:
+        for proc in shards + [service]:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in shards + [service]:
+            proc.wait()
+
+
+def load_messages(path=SIM_DATA_PATH):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row["text"] for row in csv.DictReader(f) if row.get("text")]
+
+
+async def _simulate_shard(socket_path, messages, model_only):
+    client = ScoringClient(socket_path)
+    semaphore = asyncio.Semaphore(SIM_IN_FLIGHT)
+
+    async def handle(text):
+        async with semaphore:
+            if model_only:
+                await client._call("score", texts=[clean_text(text)])
+            else:
+                await client.score([text])
+
+    await asyncio.gather(*(handle(text) for text in messages))
+
+
+def _simulate_worker(socket_path, messages, start_event, model_only):
+    start_event.wait()
+    asyncio.run(_simulate_shard(socket_path, messages, model_only))
+
+
+def simulate(count, socket_path, total=SIM_MESSAGES, model_only=False):
+    """Replays `total` dataset messages spread over `count` shard processes."""
+    corpus = load_messages()
+    per_shard = total // count
+    service = start_service(socket_path)
+    try:
+        start_event = multiprocessing.Event()
+        workers = []
+        for shard_id in range(count):
+            messages = [corpus[(shard_id * per_shard + i) % len(corpus)] for i in range(per_shard)]
+            proc = multiprocessing.Process(target=_simulate_worker,
+                                           args=(socket_path, messages, start_event, model_only))
+            proc.start()
+            workers.append(proc)
+
+        t0 = time.perf_counter()
+        start_event.set()
+        for proc in workers:
+            proc.join()
+        elapsed = time.perf_counter() - t0
+
+        failed = sum(1 for proc in workers if proc.exitcode != 0)
+        if failed:
+            print(f"{failed} simulated shard(s) failed")
+        sent = per_shard * count
+        print(f"{count} shard(s): {sent} messages in {elapsed:.2f}s — {sent / elapsed:.0f} msgs/s")
+        return sent / elapsed
+    finally:
+        service.terminate()
+        service.wait()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    count = int(option("--shards", "2"))
+    socket_path = option("--socket", DEFAULT_SOCKET_PATH)
+    if "--simulate" in args:
+        simulate(count, socket_path, int(option("--messages", str(SIM_MESSAGES))),
+                 model_only="--model-only" in args)
+    else:
+        run_shards(count, socket_path)
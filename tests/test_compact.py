@@ -0,0 +1,25 @@
+# tests/test_compact.py
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import normalize
+
+from model.compact import compact
+
+
+def test_compacted_model_is_smaller_and_consistent():
+    texts = ["free nitro click here", "you are a loser", "see you later today",
+             "verify your password here", "join our server now", "nobody likes you"]
+    labels = ["spam", "bullying", "normal", "scam", "spam", "bullying"]
+    tfidf = TfidfVectorizer(ngram_range=(1, 2))
+    X = tfidf.fit_transform(texts)
+    clf = LogisticRegression(max_iter=1000).fit(X, labels)
+
+    threshold = np.median(np.abs(clf.coef_).max(axis=0))
+    small_tfidf, small_clf = compact(tfidf, clf, X, labels, threshold=threshold)
+    assert 0 < len(small_tfidf.vocabulary_) < len(tfidf.vocabulary_)
+    assert small_clf.coef_.shape[1] == len(small_tfidf.vocabulary_)
+    # the pruned vectorizer gives the kept columns of the original, re-normalised
+    keep = [tfidf.vocabulary_[t] for t in small_tfidf.get_feature_names_out()]
+    expected = normalize(X[:, keep]).toarray()
+    assert np.allclose(small_tfidf.transform(texts).toarray(), expected)
@@ -0,0 +1,49 @@
+# tests/test_exporter.py
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from utils.exporter import export_events, read_events
+
+
+def _write(log, events):
+    with open(log, "a", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(e) + "\n")
+
+
+def _event(ts, label):
+    return {"timestamp": ts, "action": "flagged", "user": "u", "user_id": 1,
+            "channel": "Prism/general", "label": label, "prob": 0.8, "content": "x"}
+
+
+def test_incremental_partitioned_export(tmp_path):
+    log, out = tmp_path / "prism.log", tmp_path / "exports"
+    _write(log, [_event("2025-10-23T20:34:21", "spam"),
+                 _event("2025-10-24T09:00:00", "scam")])
+    assert export_events(log, out) == 2
+    assert export_events(log, out) == 0
+
+    _write(log, [_event("2025-10-24T10:00:00", "spam")])
+    assert export_events(log, out) == 1
+    assert sorted(p.name for p in out.iterdir() if p.is_dir()) == [
+        "date=2025-10-23", "date=2025-10-24"]
+
+    table = read_events(out, columns=["label", "prob"],
+                        filters=[("label", "=", "spam")])
+    assert table.num_rows == 2
+    assert table.column_names == ["label", "prob"]
+    assert str(table.schema.field("label").type).startswith("dictionary")
+
+
+def test_bad_lines_are_quarantined_not_blocking(tmp_path):
+    log, out = tmp_path / "prism.log", tmp_path / "exports"
+    _write(log, [{"action": "flagged"}, _event("not a date", "spam"),
+                 _event("2025-10-23T20:34:21", "spam")])
+    assert export_events(log, out) == 1
+    assert len((out / "_rejected.jsonl").read_text().splitlines()) == 2
+
+    _write(log, [_event("2025-10-24T09:00:00", "scam")])
+    assert export_events(log, out) == 1
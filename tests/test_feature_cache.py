@@ -0,0 +1,18 @@
+# tests/test_feature_cache.py
+import scipy.sparse
+
+from model.feature_cache import FeatureCache
+
+
+def test_cache_roundtrip_and_eviction(tmp_path):
+    cache = FeatureCache(tmp_path, max_entries=2)
+    X = scipy.sparse.random(5, 7, density=0.3, format="csr", random_state=0)
+
+    keys = [cache.key("features", i) for i in range(3)]
+    assert cache.get_sparse(keys[0], "X") is None
+    for k in keys:
+        cache.put(k, json_items={"labels": ["a"]}, sparse_items={"X": X})
+
+    assert not cache.has(keys[0])
+    assert cache.get_json(keys[2], "labels") == ["a"]
+    assert (cache.get_sparse(keys[1], "X") != X).nnz == 0
@@ -0,0 +1,62 @@
+# tests/test_online.py
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from model.online import sgd_update
+
+
+def test_sgd_update_moves_towards_feedback():
+    texts = ["free nitro here", "you are a loser", "see you later", "verify your password"]
+    labels = ["spam", "bullying", "normal", "scam"]
+    vec = TfidfVectorizer().fit(texts)
+    clf = LogisticRegression(max_iter=1000).fit(vec.transform(texts), labels)
+
+    X = vec.transform(["free nitro here"])
+    normal = list(clf.classes_).index("normal")
+    before = clf.predict_proba(X)[0, normal]
+    sgd_update(clf, X, ["normal"], epochs=20)
+    after = clf.predict_proba(X)[0, normal]
+    assert after > before
+    assert np.allclose(clf.predict_proba(X).sum(), 1.0)
+
+
+def test_unapplied_feedback_and_fixed_baseline(tmp_path, monkeypatch):
+    from model import online
+
+    monkeypatch.setattr(online, "FEEDBACK_LOG", tmp_path / "feedback.jsonl")
+    monkeypatch.setattr(online, "ONLINE_MANIFEST", str(tmp_path / "manifest.json"))
+
+    first = online.OnlineLearner()
+    for text in ("a", "b", "c"):
+        first.submit(text, "normal")
+
+    # a restarted learner replays what the last snapshot didn't cover
+    learner = online.OnlineLearner()
+    replay, live_from = learner.unapplied_feedback(offset=1)
+    assert [(r["text"], r["seq"]) for r in replay] == [("b", 1), ("c", 2)]
+    assert live_from == 3
+    learner.submit("d", "normal")
+    assert learner.queue.get()["seq"] == 3
+
+    # the baseline is stored once and not recomputed from later snapshots
+    manifest = online.read_manifest()
+    manifest["baseline_accuracy"] = 0.9
+    online.write_manifest(manifest)
+    assert learner.load_baseline(None, None) == 0.9
+
+
+def test_manifest_for_an_older_trained_model_is_archived(tmp_path, monkeypatch):
+    from model import online
+
+    manifest_path = tmp_path / "manifest.json"
+    monkeypatch.setattr(online, "ONLINE_MANIFEST", str(manifest_path))
+    snapshot = tmp_path / "old.v1.joblib"
+    snapshot.write_bytes(b"")
+    online.write_manifest({"current": str(snapshot), "versions": [], "base_model": "old",
+                           "baseline_accuracy": 0.5, "feedback_offset": 7})
+
+    assert online.resolve_model_path() == online.MODEL_PATH
+    fresh = online.read_manifest()
+    assert "baseline_accuracy" not in fresh and "feedback_offset" not in fresh
+    assert len(list(tmp_path.glob("manifest.*.json"))) == 1
@@ -0,0 +1,46 @@
+# tests/test_overload.py
+from utils import overload as ov
+from utils.overload import OverloadController
+
+
+def test_steps_down_under_load_and_recovers():
+    ctl = OverloadController(queue_budget=1.0, lag_budget=1.0)
+    t = 0.0
+    for _ in range(200):
+        t += 1.0
+        ctl.observe(lag=5.0, now=t)
+    assert ctl.level == ov.SAMPLING
+    assert [new for _, _, new in ctl.changes] == [ov.LEAN, ov.HEURISTIC, ov.SAMPLING]
+    assert not ctl.use_model()
+    assert not ctl.should_log("flagged", 0.5)
+    assert sum(ctl.admit() for _ in range(8)) == 8 // ov.OVERLOAD_SAMPLE_EVERY
+
+    for _ in range(200):
+        t += 1.0
+        ctl.observe(lag=0.0, now=t)
+    assert ctl.level == ov.NORMAL
+    assert ctl.admit() and ctl.use_model()
+
+
+def test_queue_delay_only_degrades_the_raided_guild():
+    delays = {"raid": 10.0, "calm": 0.1}
+    ctl = OverloadController(queue_delay=lambda g: delays[g], queue_budget=1.0)
+    assert ctl.level_for("raid", now=0.0) == ov.SAMPLING
+    assert not ctl.use_model("raid")
+    assert ctl.use_model("calm") and ctl.admit("calm")
+    assert ctl.level == ov.NORMAL
+
+    # recovers one level per dwell once the raid queue drains
+    delays["raid"] = 0.0
+    assert ctl.level_for("raid", now=1.0) == ov.SAMPLING
+    levels = [ctl.level_for("raid", now=1.0 + n * ov.OVERLOAD_GUILD_RECOVER_DWELL)
+              for n in range(1, 4)]
+    assert levels == [ov.HEURISTIC, ov.LEAN, ov.NORMAL]
+
+
+def test_global_sampling_still_admits_a_share_of_each_guild():
+    ctl = OverloadController(queue_delay=lambda g: 0.0)
+    ctl.level = ov.SAMPLING
+    admitted = sum(ctl.admit(123) for _ in range(40))
+    assert admitted == 40 // ov.OVERLOAD_SAMPLE_EVERY
+    assert ctl.shed == 40 - admitted
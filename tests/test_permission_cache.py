@@ -0,0 +1,25 @@
+# tests/test_permission_cache.py
+from utils.permission_cache import PermissionCache
+
+
+def test_cache_hits_and_invalidation():
+    cache = PermissionCache(maxsize=2)
+    calls = []
+    compute = lambda: calls.append(1) or True
+
+    assert cache.get((1, 10, 100), compute) is True
+    assert cache.get((1, 10, 100), compute) is True
+    assert len(calls) == 1
+
+    cache.invalidate_member(1, 100)
+    cache.get((1, 10, 100), compute)
+    assert len(calls) == 2
+
+    cache.get((1, 11, 100), compute)
+    cache.get((2, 10, 100), compute)
+    assert len(cache) == 2
+    assert cache.invalidate_guild(1) == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 4
+    assert stats["evictions"] == 1
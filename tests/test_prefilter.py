@@ -0,0 +1,33 @@
+# tests/test_prefilter.py
+from model.prefilter import KeywordAutomaton, Prefilter
+
+
+def test_automaton_finds_overlapping_patterns():
+    ac = KeywordAutomaton()
+    for p in ["he", "she", "his", "hers"]:
+        ac.add(p, p)
+    assert sorted(ac.search("ushers")) == ["he", "hers", "she"]
+
+
+def test_prefilter_tiers():
+    pf = Prefilter({"safe_messages": [], "safe_tokens": []})
+    assert pf.decide("gg lol") == ("normal", 0.95, "benign")
+    label, _, tier = pf.decide("Subscribe now to win free Nitro! Join our server")
+    assert (label, tier) == ("spam", "keyword")
+    assert pf.decide("You're worthless and pathetic.") is None
+    assert pf.decide("ok https://example.com") is None
+
+
+def test_keyword_tier_needs_separate_phrases_and_skips_warnings():
+    pf = Prefilter({"safe_messages": [], "safe_tokens": []})
+    # a phrase nested in a longer phrase is one hit, not two
+    assert pf.decide("please share your password") is None
+    assert pf.decide("Reminder: never share your password with anyone, mods will never ask") is None
+    assert pf.decide("Do not click the link from discord staff DMs, it is a scam") is None
+    assert pf.decide("discord staff here, verify here now")[:1] == ("scam",)
+
+
+def test_warning_words_inside_a_matched_phrase_do_not_count():
+    pf = Prefilter({"safe_messages": [], "safe_tokens": []})
+    assert pf.decide("Don't miss out, free nitro, join now!!") == ("spam", 0.9, "keyword")
+    assert pf.decide("Don't fall for it: free nitro, join now") is None
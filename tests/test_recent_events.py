@@ -0,0 +1,32 @@
+# tests/test_recent_events.py
+from utils.recent_events import RecentEvents
+
+
+def _event(i, content="x"):
+    return {"timestamp": f"2025-10-23T20:{i:02d}:00", "action": "flagged", "user": "u",
+            "user_id": 1, "channel": "Prism/general", "label": "spam", "prob": 0.9,
+            "content": content}
+
+
+def test_ring_buffer_wraps_and_caps_memory():
+    buf = RecentEvents(capacity=3)
+    for i in range(5):
+        buf.append(_event(i))
+    assert [e.timestamp[-5:-3] for e in buf] == ["02", "03", "04"]
+    assert [e.timestamp[-5:-3] for e in buf.latest(2)] == ["04", "03"]
+    assert buf.latest(1)[0].label is buf.latest(2)[1].label  # interned
+
+    small = RecentEvents(capacity=10, max_bytes=buf.stats()["bytes"] + 2000)
+    for i in range(10):
+        small.append(_event(i, content="y" * 1000))
+    assert 0 < len(small) < 10
+    assert small.stats()["bytes"] <= small.max_bytes
+
+
+def test_default_budget_holds_a_full_buffer_of_max_length_messages():
+    from utils.recent_events import DISCORD_MAX_MESSAGE_CHARS
+
+    buf = RecentEvents()
+    for i in range(buf.capacity + 5):
+        buf.append(_event(i % 60, content="\U0001F600" * DISCORD_MAX_MESSAGE_CHARS))
+    assert len(buf) == buf.capacity
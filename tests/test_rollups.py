@@ -0,0 +1,60 @@
+# tests/test_rollups.py
+from utils.rollups import RollupEngine
+
+
+def _event(ts, action="flagged", label="spam", prob=0.75, user_id=1):
+    return {"timestamp": ts, "action": action, "label": label, "prob": prob,
+            "user_id": user_id, "channel": "Prism/general"}
+
+
+def test_rollups_query_and_rebuild(tmp_path):
+    events = [
+        _event("2025-10-23T20:34:21"),
+        _event("2025-10-23T20:35:02", action="deleted", prob=0.95, user_id=2),
+        _event("2025-10-24T09:00:00", label="scam"),
+    ]
+    engine = RollupEngine(tmp_path / "rollups.json")
+    for e in events:
+        engine.add(e)
+
+    total = engine.query("day")
+    assert total["n"] == 3
+    assert total["action"] == {"flagged": 2, "deleted": 1}
+    assert total["conf"][7] == 2 and total["conf"][9] == 1
+    assert engine.query("hour", "2025-10-23T20", "2025-10-23T21")["n"] == 2
+    assert engine.series("minute") == [
+        ("2025-10-23T20:34", 1), ("2025-10-23T20:35", 1), ("2025-10-24T09:00", 1)]
+
+    engine.save()
+    loaded = RollupEngine.load(tmp_path / "rollups.json")
+    assert loaded.buckets == RollupEngine().rebuild(events).buckets
+
+
+def test_rebuild_keeps_buckets_older_than_the_source(tmp_path):
+    engine = RollupEngine(tmp_path / "rollups.json")
+    engine.add(_event("2025-01-05T10:00:00"))
+    engine.add(_event("2025-10-23T20:34:21"))
+    engine.add(_event("2025-10-23T20:34:50"))
+
+    # the source only reaches back to October and is missing one event there
+    engine.rebuild([_event("2025-10-23T20:34:21")])
+    assert engine.series("day") == [("2025-01-05", 1), ("2025-10-23", 2)]
+    assert engine.rebuild([]).query("day")["n"] == 3
+
+
+def test_rebuild_keeps_the_partly_covered_boundary_bucket(tmp_path):
+    engine = RollupEngine(tmp_path / "rollups.json")
+    for ts in ("2025-10-23T08:00:00", "2025-10-23T09:00:00", "2025-10-23T20:34:21",
+               "2025-10-23T21:05:00"):
+        engine.add(_event(ts))
+
+    # the log was rotated at 20:30, and the stored rollups missed the 21:40 event
+    source = [_event("2025-10-23T20:34:21"), _event("2025-10-23T21:05:00"),
+              _event("2025-10-23T21:40:00")]
+    engine.rebuild(source)
+    # the day bucket straddles the log's start and holds morning events
+    # the log no longer has, so the stored one is kept
+    assert engine.series("day") == [("2025-10-23", 4)]
+    # buckets the log fully covers are refolded from it
+    assert engine.series("hour") == [("2025-10-23T08", 1), ("2025-10-23T09", 1),
+                                     ("2025-10-23T20", 1), ("2025-10-23T21", 2)]
@@ -0,0 +1,58 @@
+# tests/test_scanner.py
+import asyncio
+from types import SimpleNamespace
+
+from utils import scanner
+from utils.scanner import ScanCheckpoints, scan_channel
+
+
+class FakeChannel:
+    id = 42
+
+    def __init__(self, texts):
+        author = SimpleNamespace(bot=False)
+        self.messages = [SimpleNamespace(id=i + 1, content=t, author=author)
+                         for i, t in enumerate(texts)]
+
+    async def history(self, limit=None, after=None, oldest_first=True):
+        start = after or 0
+        for msg in [m for m in self.messages if m.id > start][:limit]:
+            yield msg
+
+
+def test_scan_batches_and_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner, "SCAN_BATCH_DELAY", 0)
+    channel = FakeChannel(["spam here", "hello", "", "spam again", "bye"])
+    batches = []
+
+    def classify(texts):
+        batches.append(len(texts))
+        return [("spam", 0.9) if "spam" in t else ("normal", 0.9) for t in texts]
+
+    async def on_hit(msg, label, prob):
+        return "flagged"
+
+    cps = ScanCheckpoints(tmp_path / "cp.json")
+    summary = asyncio.run(scan_channel(channel, classify, checkpoints=cps,
+                                       on_hit=on_hit, batch_size=2))
+    assert summary["scanned"] == 5 and summary["skipped"] == 1
+    assert summary["flagged"] == 2
+    assert batches == [2, 2]
+    assert ScanCheckpoints(tmp_path / "cp.json").get(42) == {
+        "after": 5, "scanned": 5, "done": True,
+        "finished": cps.get(42)["finished"],
+    }
+
+    # resuming from the checkpoint finds nothing new
+    summary = asyncio.run(scan_channel(channel, classify, after=5, batch_size=2))
+    assert summary["scanned"] == 0
+
+
+def test_checkpoint_instances_merge_instead_of_overwriting(tmp_path):
+    path = tmp_path / "checkpoints.json"
+    a, b = ScanCheckpoints(path), ScanCheckpoints(path)
+    a.update(1, after=10)
+    b.update(2, after=20)
+    a.update(1, after=11)
+    assert ScanCheckpoints(path).get(1) == {"after": 11}
+    assert ScanCheckpoints(path).get(2) == {"after": 20}
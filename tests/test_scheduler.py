@@ -0,0 +1,31 @@
+# tests/test_scheduler.py
+import asyncio
+
+from utils.scheduler import FairScheduler
+
+
+def test_raided_guild_does_not_starve_others():
+    order = []
+
+    async def main():
+        sched = FairScheduler(workers=1, per_guild_limit=1)
+
+        def job(guild, i):
+            async def run():
+                order.append((guild, i))
+                await asyncio.sleep(0)
+                return i
+            return run
+
+        raid = [sched.submit("raid", job("raid", i)) for i in range(50)]
+        calm = [sched.submit("calm", job("calm", i)) for i in range(3)]
+        results = await asyncio.gather(*raid, *calm)
+        return sched, results
+
+    sched, results = asyncio.run(main())
+    assert results == list(range(50)) + list(range(3))
+    # calm's three messages are served within the first few turns, not after the raid
+    calm_positions = [n for n, (g, _) in enumerate(order) if g == "calm"]
+    assert calm_positions == [1, 3, 5]
+    assert sched.guild_stats("raid")["max_depth"] == 50
+    assert sched.guild_stats("calm")["completed"] == 3
@@ -0,0 +1,85 @@
+# tests/test_scoring_service.py
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from model import scoring_service
+from model.scoring_service import ScoringClient, ScoringServer, start_score_workers
+
+
+def test_concurrent_shards_share_one_service(tmp_path):
+    path = str(tmp_path / "scoring.sock")
+    logged = []
+    batches = []
+
+    def classify(texts):
+        batches.append(len(texts))
+        return [("spam" if "buy" in t else "normal", 0.9) for t in texts]
+
+    async def main():
+        server = await ScoringServer(path, classify, log=logged.append,
+                                     history=lambda n: logged[-n:][::-1]).start()
+        shards = [ScoringClient(path), ScoringClient(path)]
+
+        async def shard(client, n):
+            texts = [f"buy now {n} {i}" if i % 2 else f"hello {n} {i}" for i in range(20)]
+            scored = await asyncio.gather(*(client._call("score", texts=[t]) for t in texts))
+            await asyncio.gather(*(client.log({"shard": n, "i": i}) for i in range(20)))
+            return scored
+
+        results = await asyncio.gather(*(shard(c, n) for n, c in enumerate(shards)))
+        history = await shards[0].history(3)
+        stats = await shards[1].stats()
+        await server.close()
+        return results, history, stats
+
+    results, history, stats = asyncio.run(main())
+    for scored in results:
+        assert [r[0][0] for r in scored] == ["normal", "spam"] * 10
+    # every event from both shards was written exactly once
+    assert sorted((e["shard"], e["i"]) for e in logged) == [(n, i) for n in range(2) for i in range(20)]
+    assert history == logged[-3:][::-1]
+    # concurrent requests were micro-batched into fewer model calls
+    assert sum(batches) == 40 and len(batches) < 40
+    assert stats["logged"] == 40
+
+
+_weights = SimpleNamespace(coef_=np.zeros((1, 1)), intercept_=np.zeros(1))
+
+
+def _length_classify(texts):
+    # runs in the forked workers, on their inherited copy of _weights
+    scoring_service._worker_shared.refresh(_weights)
+    limit = _weights.intercept_[0]
+    return [("long" if len(t) > limit else "short", 1.0) for t in texts]
+
+
+def test_worker_processes_pick_up_published_models(tmp_path):
+    path = str(tmp_path / "scoring.sock")
+    version = [0]
+    _weights.intercept_[0] = 5
+    executor, shared = start_score_workers(2, _weights)
+    pids = set(executor._processes)
+
+    def publish():
+        shared.publish(SimpleNamespace(coef_=np.zeros((1, 1)), intercept_=np.array([20.0])))
+
+    async def main():
+        server = await ScoringServer(path, _length_classify, workers=2, executor=executor,
+                                     model_version=lambda: version[0],
+                                     on_model_change=publish).start()
+        client = ScoringClient(path)
+        texts = ["hi", "hello there"] * 20
+        first = await asyncio.gather(*(client._call("score", texts=[t]) for t in texts))
+        version[0] += 1   # e.g. online learning published a new model
+        second = await asyncio.gather(*(client._call("score", texts=[t]) for t in texts))
+        forked = set(executor._processes)
+        await server.close()
+        return first, second, forked
+
+    first, second, forked = asyncio.run(main())
+    assert [r[0][0] for r in first] == ["short", "long"] * 20
+    # every worker scores with the new coefficients, and none was re-forked
+    assert [r[0][0] for r in second] == ["short"] * 40
+    assert forked == pids and len(pids) == 2
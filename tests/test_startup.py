@@ -0,0 +1,28 @@
+# tests/test_startup.py
+import asyncio
+
+from utils import startup
+
+
+def test_callbacks_run_after_a_retried_warmup(monkeypatch):
+    attempts = []
+
+    def fake_warm_up(future):
+        attempts.append(future)
+        if len(attempts) == 1:
+            future.set_exception(RuntimeError("model not trained yet"))
+        else:
+            future.set_result({})
+
+    monkeypatch.setattr(startup, "_warm_up", fake_warm_up)
+    monkeypatch.setattr(startup, "_future", None)
+    monkeypatch.setattr(startup, "_callbacks", [])
+
+    outcomes = []
+    startup.add_done_callback(lambda f: outcomes.append(f.exception() is None))
+    startup.start_warmup().exception(timeout=5)
+    assert not startup.is_ready()
+
+    asyncio.run(startup.wait_ready())
+    assert startup.is_ready()
+    assert outcomes == [False, True]
@@ -0,0 +1,170 @@
+# utils/exporter.py
+"""
+Columnar export of moderation history for offline analysis.
+
+Events are streamed line by line from the append-only JSON-lines log
+(logs/prism.log) into date-partitioned Parquet files:
+
+    exports/date=2025-10-23/part-20251024T010203.parquet
+
+label, action, channel and user are dictionary-encoded. Each run only
+exports lines added since the previous run (tracked by byte offset), and
+read_events() loads selected columns with predicates pushed down to the
+partition and row-group level. Lines that can't be parsed (bad JSON, a
+missing or invalid timestamp) are copied to exports/_rejected.jsonl and
+skipped, so one bad line never stalls the export.
+
+Requires pyarrow (pip install pyarrow).
+"""
+import datetime
+import json
+from pathlib import Path
+
+from utils.logger import LOG_FILE
+
+# Configuration
+EXPORT_DIR = Path("exports")
+EXPORT_STATE = "_export_state.json"
+EXPORT_REJECTED = "_rejected.jsonl"
+EXPORT_CHUNK = 50_000          # events buffered before a flush to Parquet
+
+DICT_COLUMNS = ("action", "label", "channel", "user")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _schema(pa):
+    return pa.schema([
+        ("timestamp", pa.timestamp("us")),
+        ("action", pa.dictionary(pa.int32(), pa.string())),
+        ("label", pa.dictionary(pa.int32(), pa.string())),
+        ("channel", pa.dictionary(pa.int32(), pa.string())),
+        ("user", pa.dictionary(pa.int32(), pa.string())),
+        ("user_id", pa.int64()),
+        ("prob", pa.float32()),
+        ("content", pa.string()),
+    ])
+
+
+def _load_state(out_dir):
+    path = out_dir / EXPORT_STATE
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"offset": 0, "exported": 0, "rejected": 0}
+
+
+def _save_state(out_dir, state):
+    tmp = out_dir / (EXPORT_STATE + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(out_dir / EXPORT_STATE)
+
+
+def _write_partitions(pa, pq, rows_by_date, out_dir, run_id):
+    schema = _schema(pa)
+    for date, rows in rows_by_date.items():
+        part_dir = out_dir / f"date={date}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        columns = {name: [r[name] for r in rows] for name in schema.names}
+        table = pa.table(columns, schema=schema)
+        # one file per date per flush; never rewrite earlier parts
+        n = len(list(part_dir.glob(f"part-{run_id}*.parquet")))
+        pq.write_table(table, part_dir / f"part-{run_id}-{n}.parquet",
+                       compression="zstd", use_dictionary=list(DICT_COLUMNS))
+
+
+def export_events(log_path=LOG_FILE, out_dir=EXPORT_DIR):
+    """
+    Exports events appended to log_path since the last run.
+    Returns the number of events written.
+    """
+    pa, pq = _require_pyarrow()
+    log_path, out_dir = Path(log_path), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if not log_path.exists():
+        return 0
+
+    state = _load_state(out_dir)
+    offset = state["offset"]
+    if offset > log_path.stat().st_size:
+        # log was rotated or truncated; start over on the new file
+        offset = 0
+
+    run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    rows_by_date = {}
+    buffered = written = 0
+    rejected = state.get("rejected", 0)
+
+    def reject(raw):
+        nonlocal rejected
+        rejected += 1
+        with open(out_dir / EXPORT_REJECTED, 'ab') as r:
+            r.write(raw)
+
+    def save():
+        _save_state(out_dir, {"offset": offset, "exported": state["exported"] + written,
+                              "rejected": rejected})
+
+    with open(log_path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # partially written line; pick it up next run
+            offset += len(raw)
+            try:
+                event = json.loads(raw)
+                ts = event["timestamp"]
+                row = {
+                    "timestamp": datetime.datetime.fromisoformat(ts),
+                    "action": event.get("action", "unknown"),
+                    "label": event.get("label", "unknown"),
+                    "channel": event.get("channel", "unknown"),
+                    "user": event.get("user", "unknown"),
+                    "user_id": int(event.get("user_id", 0)),
+                    "prob": float(event.get("prob", 0)),
+                    "content": event.get("content", ""),
+                }
+            except (ValueError, TypeError, KeyError, AttributeError):
+                reject(raw)
+                continue
+            rows_by_date.setdefault(ts[:10], []).append(row)
+            buffered += 1
+            if buffered >= EXPORT_CHUNK:
+                _write_partitions(pa, pq, rows_by_date, out_dir, run_id)
+                written += buffered
+                rows_by_date, buffered = {}, 0
+                save()
+
+    if buffered:
+        _write_partitions(pa, pq, rows_by_date, out_dir, run_id)
+        written += buffered
+    save()
+    return written
+
+
+def read_events(out_dir=EXPORT_DIR, columns=None, filters=None):
+    """
+    Loads exported events as a pyarrow Table.
+
+    columns: list of column names to read (None = all)
+    filters: pyarrow DNF filters, e.g.
+        [("date", ">=", "2025-10-01"), ("label", "=", "scam")]
+    Filters on `date` prune whole partitions; the rest use Parquet
+    row-group statistics.
+    """
+    pa, pq = _require_pyarrow()
+    return pq.read_table(out_dir, columns=columns, filters=filters,
+                         partitioning="hive")
+
+
+if __name__ == "__main__":
+    n = export_events()
+    print(f"Exported {n} new events to {EXPORT_DIR}/")
@@ -1,14 +1,19 @@
 # utils/logger.py
 import os
 import json
+import atexit
 import datetime
+import threading
 from pathlib import Path
+from utils.rollups import RollupEngine
+from utils.recent_events import RecentEvents
 
 # Configuration
 LOG_DIR = Path("logs")
 LOG_FILE = LOG_DIR / "prism.log"
 REPORT_HTML = LOG_DIR / "report.html"
 REPORT_JSON = LOG_DIR / "report_data.json"
+ROLLUPS_SAVE_INTERVAL = 5.0   # seconds between rollup writes while events arrive
 
 # Ensure directories exist
 LOG_DIR.mkdir(exist_ok=True)
@@ -18,9 +23,14 @@ if not REPORT_JSON.exists():
     with open(REPORT_JSON, 'w', encoding='utf-8') as f:
         json.dump({"events": []}, f, indent=2)
 
+# Recent events served from memory; the disk copy is only written, not re-read
+recent_events = RecentEvents()
+recent_events.load(REPORT_JSON)
+
 def log_event(event: dict):
     """Logs moderation events to both .log and update the dashboard"""
-    ts = datetime.datetime.now().isoformat()
+    # backfilled events (!scan) carry the original message time
+    ts = event.get('timestamp') or datetime.datetime.now().isoformat()
     log_entry = {
         "timestamp": ts,
         "action": event.get('action', 'unknown'),
@@ -32,28 +42,33 @@ def log_event(event: dict):
         "content": event.get('content', '')
     }
 
-    # Append to JSON log
-    _update_json_log(log_entry)
+    # Append to the raw event log (one JSON object per line)
+    _append_log_line(log_entry)
+
+    # Keep in the in-memory ring buffer, then mirror it to the JSON log
+    recent_events.append(log_entry)
+    _update_json_log()
+
+    # Fold into analytics rollups
+    _update_rollups(log_entry)
     
     # Update HTML dashboard
     _update_html_dashboard()
 
-def _update_json_log(entry):
-    """Update the JSON log file with new entry"""
+def _append_log_line(entry):
+    """Append the event to the append-only JSON-lines log"""
     try:
-        # Read existing data
-        if REPORT_JSON.exists() and REPORT_JSON.stat().st_size > 0:
-            with open(REPORT_JSON, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            data = {"events": []}
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"Error appending to log file: {e}")
 
-        # Add new entry
-        data["events"].append(entry)
-        
-        # Keep only last 1000 events to prevent file bloat
-        if len(data["events"]) > 1000:
-            data["events"] = data["events"][-1000:]
+def _update_json_log():
+    """Write the recent-events buffer (which already holds the new entry) to the JSON log"""
+    try:
+        # The ring buffer keeps only the last RECENT_EVENTS_CAPACITY events,
+        # so the file can't bloat and never needs to be read back
+        data = {"events": recent_events.to_dicts()}
 
         # Save back to file
         with open(REPORT_JSON, 'w', encoding='utf-8') as f:
@@ -62,17 +77,68 @@ def _update_json_log(entry):
     except Exception as e:
         print(f"Error updating JSON log: {e}")
 
+_rollups = None
+_rollups_lock = threading.Lock()
+_rollups_timer = None
+
+def _get_rollups():
+    global _rollups
+    if _rollups is None:
+        _rollups = RollupEngine.load()
+    return _rollups
+
+def _update_rollups(entry):
+    """Fold one event into the rollups; the file is written at most every ROLLUPS_SAVE_INTERVAL"""
+    global _rollups_timer
+    try:
+        with _rollups_lock:
+            _get_rollups().add(entry)
+            if _rollups_timer is None:
+                _rollups_timer = threading.Timer(ROLLUPS_SAVE_INTERVAL, flush_rollups)
+                _rollups_timer.daemon = True
+                _rollups_timer.start()
+    except Exception as e:
+        print(f"Error updating rollups: {e}")
+
+def flush_rollups():
+    """Write pending rollup changes to disk"""
+    global _rollups_timer
+    with _rollups_lock:
+        _rollups_timer = None
+        if _rollups is None:
+            return
+        try:
+            _rollups.save()
+        except Exception as e:
+            print(f"Error saving rollups: {e}")
+
+atexit.register(flush_rollups)
+
+def _read_log_lines():
+    """Events from the append-only JSON-lines log (other lines are skipped)"""
+    events = []
+    if not LOG_FILE.exists():
+        return events
+    with open(LOG_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+def rebuild_rollups():
+    """Rebuild the rollups from the append-only event log, keeping older buckets it doesn't cover"""
+    with _rollups_lock:
+        rollups = _get_rollups().rebuild(_read_log_lines())
+        rollups.save()
+    return rollups
+
 def _update_html_dashboard():
     """Regenerate the HTML dashboard with current data"""
     try:
-        # Read the latest data
-        with open(REPORT_JSON, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Sort events by timestamp (newest first)
-        events = sorted(data.get("events", []), 
-                       key=lambda x: x.get("timestamp", ""), 
-                       reverse=True)
+        # Latest events from memory (newest first)
+        events = [r.to_dict() for r in recent_events.latest(len(recent_events))]
         
         # Generate rows
         rows = []
@@ -468,11 +534,25 @@ def _html_template_end():
             renderTable(filteredEvents);
         }
         
-        // Update statistics
-        function updateStats(events) {
-            const flaggedCount = events.filter(e => e.action === 'flagged').length;
-            const deletedCount = events.filter(e => e.action === 'deleted').length;
-            const uniqueUsers = new Set(events.map(e => e.user_id)).size;
+        // Update statistics from the daily rollups, falling back to raw events
+        async function updateStats(events) {
+            let flaggedCount, deletedCount, uniqueUsers;
+            try {
+                const response = await fetch('rollups.json');
+                const days = Object.values((await response.json()).day || {});
+                const users = new Set();
+                flaggedCount = deletedCount = 0;
+                days.forEach(b => {
+                    flaggedCount += b.action.flagged || 0;
+                    deletedCount += b.action.deleted || 0;
+                    Object.keys(b.user).forEach(u => users.add(u));
+                });
+                uniqueUsers = users.size;
+            } catch (error) {
+                flaggedCount = events.filter(e => e.action === 'flagged').length;
+                deletedCount = events.filter(e => e.action === 'deleted').length;
+                uniqueUsers = new Set(events.map(e => e.user_id)).size;
+            }
             
             document.getElementById('total-flagged').textContent = flaggedCount;
             document.getElementById('total-deleted').textContent = deletedCount;
@@ -0,0 +1,196 @@
+# utils/overload.py
+"""
+Overload control for live moderation.
+
+Degradation levels:
+
+  0 NORMAL     full pipeline
+  1 LEAN       low-confidence flags are not written to the logs/dashboard
+  2 HEURISTIC  prefilter-only scoring; the model is skipped
+  3 SAMPLING   additionally only 1 in OVERLOAD_SAMPLE_EVERY messages is admitted
+
+The global level follows event-loop lag, which hurts every guild: a
+monitor task samples it every OVERLOAD_TICK seconds, steps down one level
+at a time while it is over budget and steps back up once it has stayed
+low for a while. Queue delay is per guild: each guild gets a level from
+the age of its own oldest queued message, so a raid only degrades the
+raided guild. A message is handled at the worse of the two levels.
+
+Every level change is logged.
+"""
+import asyncio
+import logging
+import time
+
+# Configuration
+OVERLOAD_TICK = 0.5                 # seconds between samples
+OVERLOAD_QUEUE_DELAY_BUDGET = 2.0   # seconds a guild's oldest queued message may wait
+OVERLOAD_LOOP_LAG_BUDGET = 0.25     # seconds of event-loop lag
+OVERLOAD_SMOOTHING = 0.3            # EWMA weight of the newest sample
+OVERLOAD_STEP_UP_DWELL = 5.0        # seconds at a level before degrading further
+OVERLOAD_RECOVER_DWELL = 30.0       # seconds of low pressure before recovering a level
+OVERLOAD_RECOVER_RATIO = 0.5        # "low pressure" = below this fraction of budget
+OVERLOAD_GUILD_STEPS = (1.0, 2.0, 4.0)  # queue delay (x budget) for LEAN, HEURISTIC, SAMPLING
+OVERLOAD_GUILD_RECOVER_DWELL = 10.0     # seconds below a guild's level before it recovers one
+OVERLOAD_LOW_CONFIDENCE = 0.8       # flags below this aren't logged from LEAN upwards
+OVERLOAD_SAMPLE_EVERY = 4
+
+NORMAL, LEAN, HEURISTIC, SAMPLING = range(4)
+LEVEL_NAMES = ("normal", "lean", "heuristic", "sampling")
+
+
+class _GuildState:
+    __slots__ = ("level", "low_since")
+
+    def __init__(self):
+        self.level = NORMAL
+        self.low_since = None
+
+
+class OverloadController:
+    def __init__(self, queue_delay=None, queue_budget=OVERLOAD_QUEUE_DELAY_BUDGET,
+                 lag_budget=OVERLOAD_LOOP_LAG_BUDGET):
+        """queue_delay: callable(guild_id) returning that guild's oldest queue wait in seconds."""
+        self.queue_delay = queue_delay or (lambda guild_id: 0.0)
+        self.queue_budget = queue_budget
+        self.lag_budget = lag_budget
+        self.level = NORMAL
+        self.pressure = 0.0
+        self.lag = 0.0
+        self.changes = []
+        self._changed_at = float("-inf")
+        self._low_since = None
+        self._guilds = {}
+        self._admitted = {}          # per-guild sampling counters, kept apart from _guilds
+        self.shed = 0
+        self._task = None
+
+    # ---- decisions used by the message path ----
+
+    def admit(self, guild_id=None):
+        """Admission control: False means drop this message unscored."""
+        if self.level_for(guild_id) < SAMPLING:
+            self._admitted.pop(guild_id, None)
+            return True
+        admitted = self._admitted[guild_id] = self._admitted.get(guild_id, 0) + 1
+        if admitted % OVERLOAD_SAMPLE_EVERY == 0:
+            return True
+        self.shed += 1
+        return False
+
+    def use_model(self, guild_id=None):
+        return self.level_for(guild_id) < HEURISTIC
+
+    def should_log(self, action, prob, guild_id=None):
+        return not (self.level_for(guild_id) >= LEAN and action == "flagged"
+                    and prob < OVERLOAD_LOW_CONFIDENCE)
+
+    def level_for(self, guild_id, now=None):
+        """The worse of the global (loop lag) level and the guild's queue level."""
+        if guild_id is None:
+            return self.level
+        return max(self.level, self.guild_level(guild_id, now))
+
+    # ---- per-guild queue delay ----
+
+    def _guild(self, guild_id):
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildState()
+        return state
+
+    def guild_level(self, guild_id, now=None):
+        """
+        Level from the guild's own queue delay: rises as soon as a step is
+        crossed, recovers one level per OVERLOAD_GUILD_RECOVER_DWELL below it.
+        """
+        now = time.monotonic() if now is None else now
+        delay = self.queue_delay(guild_id)
+        target = sum(delay >= step * self.queue_budget for step in OVERLOAD_GUILD_STEPS)
+        state = self._guilds.get(guild_id)
+        if state is None:
+            if target == NORMAL:
+                return NORMAL
+            state = self._guild(guild_id)
+
+        old = state.level
+        if target > state.level:
+            state.level, state.low_since = target, None
+        elif target < state.level:
+            if state.low_since is None:
+                state.low_since = now
+            elif now - state.low_since >= OVERLOAD_GUILD_RECOVER_DWELL:
+                state.level -= 1
+                state.low_since = now
+        else:
+            state.low_since = None
+
+        if state.level != old:
+            log = logging.warning if state.level > old else logging.info
+            log("PRISM overload mode for guild %s %s -> %s (queue delay %.0f ms)",
+                guild_id, LEVEL_NAMES[old], LEVEL_NAMES[state.level], delay * 1000)
+        if state.level == NORMAL:
+            # forget recovered guilds so the table only holds degraded ones
+            del self._guilds[guild_id]
+            return NORMAL
+        return state.level
+
+    # ---- control loop ----
+
+    def observe(self, lag, now=None):
+        """Feeds one event-loop lag sample and moves the global level at most one step."""
+        now = time.monotonic() if now is None else now
+        a = OVERLOAD_SMOOTHING
+        self.lag = a * lag + (1 - a) * self.lag
+        self.pressure = self.lag / self.lag_budget
+
+        dwell = now - self._changed_at
+        if self.pressure > 1.0:
+            self._low_since = None
+            if self.level < SAMPLING and dwell >= OVERLOAD_STEP_UP_DWELL:
+                self._set_level(self.level + 1, now)
+        elif self.pressure < OVERLOAD_RECOVER_RATIO:
+            if self._low_since is None:
+                self._low_since = now
+            if (self.level > NORMAL and now - self._low_since >= OVERLOAD_RECOVER_DWELL
+                    and dwell >= OVERLOAD_RECOVER_DWELL):
+                self._set_level(self.level - 1, now)
+                self._low_since = now
+        else:
+            self._low_since = None
+
+    def _set_level(self, level, now):
+        old, self.level = self.level, level
+        self._changed_at = now
+        self.changes.append((now, old, level))
+        log = logging.warning if level > old else logging.info
+        log("PRISM overload mode %s -> %s (pressure %.2f, loop lag %.0f ms)",
+            LEVEL_NAMES[old], LEVEL_NAMES[level], self.pressure, self.lag * 1000)
+
+    async def _monitor(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(OVERLOAD_TICK)
+            lag = max(0.0, time.monotonic() - start - OVERLOAD_TICK)
+            try:
+                self.observe(lag)
+            except Exception as e:
+                logging.exception("Overload monitor error: %s", e)
+
+    def start(self):
+        """Starts the monitor task on the running loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+        return self._task
+
+    def stats(self, guild_id=None):
+        return {
+            "level": LEVEL_NAMES[self.level_for(guild_id)],
+            "global_level": LEVEL_NAMES[self.level],
+            "pressure": self.pressure,
+            "loop_lag": self.lag,
+            "queue_delay": self.queue_delay(guild_id) if guild_id is not None else 0.0,
+            "degraded_guilds": len(self._guilds),
+            "shed": self.shed,
+            "changes": len(self.changes),
+        }
@@ -0,0 +1,76 @@
+# utils/permission_cache.py
+from collections import OrderedDict
+
+# Configuration
+PERMISSION_CACHE_SIZE = 4096
+
+
+class PermissionCache:
+    """
+    Bounded LRU cache of "is this member a moderator in this channel" results,
+    keyed by (guild_id, channel_id, member_id).
+    Entries are dropped by the gateway events that can change the answer.
+    """
+
+    def __init__(self, maxsize=PERMISSION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, compute):
+        """Return the cached value for key, calling compute() on a miss."""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return value
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def _drop(self, match):
+        stale = [k for k in self._entries if match(k)]
+        for k in stale:
+            del self._entries[k]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_guild(self, guild_id):
+        """Role changes can affect anyone in the guild."""
+        return self._drop(lambda k: k[0] == guild_id)
+
+    def invalidate_channel(self, guild_id, channel_id):
+        """Overwrite changes only affect one channel."""
+        return self._drop(lambda k: k[0] == guild_id and k[1] == channel_id)
+
+    def invalidate_member(self, guild_id, member_id):
+        """A member's role list changed."""
+        return self._drop(lambda k: k[0] == guild_id and k[2] == member_id)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,6 +1,9 @@
 # utils/preprocess.py
 import re
 
+# Bump whenever clean_text's output changes; cached training features key on it.
+CLEAN_TEXT_VERSION = 1
+
 def clean_text(text: str) -> str:
     if text is None:
         return ""
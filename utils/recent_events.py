@@ -0,0 +1,129 @@
+# utils/recent_events.py
+"""
+Process-wide ring buffer of the most recent moderation events.
+
+Records use __slots__ and intern the low-cardinality strings (action,
+label, user, channel) so thousands of events cost little memory. The
+buffer is filled from report_data.json when the logger is imported and
+then serves !history and the dashboard rebuilds without touching disk.
+It is bounded both by event count and by an approximate byte budget.
+
+The buffer is also what report_data.json is written from, so the byte
+budget is sized to hold a full buffer of maximum-length Discord messages;
+it only trims below RECENT_EVENTS_CAPACITY (on disk as well) when content
+is longer than Discord allows, e.g. events logged from other sources.
+"""
+import json
+import sys
+
+# Configuration
+RECENT_EVENTS_CAPACITY = 1000               # same window report_data.json keeps
+DISCORD_MAX_MESSAGE_CHARS = 4000
+# a max-length message of 4-byte characters, plus the record, timestamp and numbers
+_MAX_RECORD_BYTES = sys.getsizeof("\U0001F600" * DISCORD_MAX_MESSAGE_CHARS) + 512
+RECENT_EVENTS_MAX_BYTES = RECENT_EVENTS_CAPACITY * _MAX_RECORD_BYTES   # ~16 MiB
+
+
+class EventRecord:
+    __slots__ = ("timestamp", "action", "user", "user_id", "channel", "label", "prob", "content")
+
+    def __init__(self, timestamp, action, user, user_id, channel, label, prob, content):
+        self.timestamp = timestamp
+        self.action = sys.intern(action)
+        self.user = sys.intern(user)
+        self.user_id = user_id
+        self.channel = sys.intern(channel)
+        self.label = sys.intern(label)
+        self.prob = prob
+        self.content = content
+
+    @classmethod
+    def from_dict(cls, event):
+        return cls(
+            str(event.get("timestamp", "")),
+            str(event.get("action", "unknown")),
+            str(event.get("user", "unknown")),
+            int(event.get("user_id", 0)),
+            str(event.get("channel", "unknown")),
+            str(event.get("label", "unknown")),
+            float(event.get("prob", 0)),
+            str(event.get("content", "")),
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def nbytes(self):
+        # interned strings are shared between records, so they are not counted
+        return (sys.getsizeof(self) + sys.getsizeof(self.timestamp)
+                + sys.getsizeof(self.content) + sys.getsizeof(self.user_id)
+                + sys.getsizeof(self.prob))
+
+
+class RecentEvents:
+    def __init__(self, capacity=RECENT_EVENTS_CAPACITY, max_bytes=RECENT_EVENTS_MAX_BYTES):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._slots = [None] * capacity
+        self._start = 0      # index of the oldest record
+        self._len = 0
+        self._bytes = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        """Oldest to newest."""
+        for i in range(self._len):
+            yield self._slots[(self._start + i) % self.capacity]
+
+    def _pop_oldest(self):
+        record = self._slots[self._start]
+        self._slots[self._start] = None
+        self._start = (self._start + 1) % self.capacity
+        self._len -= 1
+        self._bytes -= record.nbytes()
+        self.dropped += 1
+
+    def append(self, event):
+        """Adds an event dict (as written by log_event); returns its record."""
+        record = EventRecord.from_dict(event)
+        if self._len == self.capacity:
+            self._pop_oldest()
+        self._slots[(self._start + self._len) % self.capacity] = record
+        self._len += 1
+        self._bytes += record.nbytes()
+        while self._bytes > self.max_bytes and self._len > 1:
+            self._pop_oldest()
+        return record
+
+    def latest(self, n):
+        """The newest n records, newest first."""
+        n = max(0, min(n, self._len))
+        return [self._slots[(self._start + self._len - 1 - i) % self.capacity]
+                for i in range(n)]
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+    def load(self, path):
+        """Fills the buffer from a report_data.json-style file."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                events = json.load(f).get("events", [])
+        except Exception as e:
+            print(f"Error loading recent events: {e}")
+            return 0
+        for event in sorted(events, key=lambda e: e.get("timestamp", ""))[-self.capacity:]:
+            self.append(event)
+        return len(self)
+
+    def stats(self):
+        return {
+            "events": self._len,
+            "capacity": self.capacity,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "dropped": self.dropped,
+        }
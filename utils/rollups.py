@@ -0,0 +1,144 @@
+# utils/rollups.py
+"""
+Time-bucketed analytics rollups for moderation events.
+
+Each event is folded into per-minute, per-hour and per-day buckets as it is
+logged, so dashboards read O(buckets) aggregates instead of rescanning the
+raw event list. Buckets are keyed by the ISO timestamp prefix of the event
+("2025-10-23T20:34", "2025-10-23T20", "2025-10-23") and can be rebuilt
+from the append-only raw log with rebuild().
+"""
+import json
+from pathlib import Path
+
+# Configuration
+ROLLUPS_JSON = Path("logs") / "rollups.json"
+CONF_BINS = 10
+# bucket granularity -> (timestamp prefix length, buckets kept; None = forever)
+GRANULARITIES = {
+    "minute": (16, 2 * 24 * 60),
+    "hour": (13, 90 * 24),
+    "day": (10, None),
+}
+DIMENSIONS = ("action", "label", "channel", "user")
+
+
+def _new_bucket():
+    return {"n": 0, "action": {}, "label": {}, "channel": {}, "user": {},
+            "conf": [0] * CONF_BINS}
+
+
+def _merge(into, bucket):
+    into["n"] += bucket["n"]
+    for dim in DIMENSIONS:
+        counts = into[dim]
+        for k, v in bucket[dim].items():
+            counts[k] = counts.get(k, 0) + v
+    into["conf"] = [a + b for a, b in zip(into["conf"], bucket["conf"])]
+    return into
+
+
+class RollupEngine:
+    def __init__(self, path=ROLLUPS_JSON):
+        self.path = Path(path)
+        self.buckets = {g: {} for g in GRANULARITIES}
+
+    @classmethod
+    def load(cls, path=ROLLUPS_JSON):
+        engine = cls(path)
+        if engine.path.exists() and engine.path.stat().st_size > 0:
+            try:
+                with open(engine.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for g in GRANULARITIES:
+                    engine.buckets[g] = data.get(g, {})
+            except Exception as e:
+                print(f"Error reading rollups: {e}")
+        return engine
+
+    def add(self, event):
+        """Folds one logged event (see logger.log_event) into every granularity."""
+        ts = event.get("timestamp", "")
+        prob = float(event.get("prob", 0))
+        conf_bin = min(max(int(prob * CONF_BINS), 0), CONF_BINS - 1)
+        keys = {
+            "action": event.get("action", "unknown"),
+            "label": event.get("label", "unknown"),
+            "channel": event.get("channel", "unknown"),
+            "user": str(event.get("user_id", 0)),
+        }
+        for g, (width, keep) in GRANULARITIES.items():
+            series = self.buckets[g]
+            key = ts[:width]
+            bucket = series.get(key)
+            if bucket is None:
+                bucket = series[key] = _new_bucket()
+                if keep is not None and len(series) > keep:
+                    for old in sorted(series)[:len(series) - keep]:
+                        del series[old]
+            bucket["n"] += 1
+            for dim, value in keys.items():
+                counts = bucket[dim]
+                counts[value] = counts.get(value, 0) + 1
+            bucket["conf"][conf_bin] += 1
+
+    def query(self, granularity="day", start=None, end=None):
+        """
+        Totals over buckets with start <= key < end (ISO prefixes or full
+        timestamps; either bound may be None).
+        """
+        width = GRANULARITIES[granularity][0]
+        lo = start[:width] if start else None
+        hi = end[:width] if end else None
+        total = _new_bucket()
+        for key, bucket in self.buckets[granularity].items():
+            if (lo is None or key >= lo) and (hi is None or key < hi):
+                _merge(total, bucket)
+        return total
+
+    def series(self, granularity="day", dimension=None):
+        """[(bucket_key, count)] in time order, or per-dimension counts."""
+        out = []
+        for key in sorted(self.buckets[granularity]):
+            bucket = self.buckets[granularity][key]
+            out.append((key, bucket[dimension] if dimension else bucket["n"]))
+        return out
+
+    def rebuild(self, events):
+        """
+        Refolds buckets from raw events. Buckets older than the first event
+        are kept as they are, since the source no longer covers them. The
+        bucket holding the first event may be only partly covered (the log
+        starts mid-bucket), so the stored one wins if it counted more events.
+        """
+        events = sorted(events, key=lambda e: e.get("timestamp", ""))
+        if not events:
+            return self
+        first = events[0].get("timestamp", "")
+        boundary = {}
+        for g, (width, _) in GRANULARITIES.items():
+            key = first[:width]
+            if key in self.buckets[g]:
+                boundary[g] = (key, self.buckets[g][key])
+            self.buckets[g] = {k: v for k, v in self.buckets[g].items() if k < key}
+        for event in events:
+            self.add(event)
+        for g, (key, stored) in boundary.items():
+            rebuilt = self.buckets[g].get(key)
+            if rebuilt is not None and stored["n"] > rebuilt["n"]:
+                self.buckets[g][key] = stored
+        return self
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.buckets, f, separators=(",", ":"), ensure_ascii=False)
+        tmp.replace(self.path)
+
+
+if __name__ == "__main__":
+    # python -m utils.rollups  -> rebuild rollups from logs/prism.log
+    from utils.logger import rebuild_rollups
+    engine = rebuild_rollups()
+    print(f"Rebuilt rollups: {len(engine.buckets['day'])} days, "
+          f"{engine.query('day')['n']} events")
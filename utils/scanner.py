@@ -0,0 +1,165 @@
+# utils/scanner.py
+"""
+Backfill scanning of channel history for the !scan command.
+
+History is paged oldest-first, classified in batches on a dedicated worker
+thread (so live moderation on the event loop is never blocked), and the
+last processed message id is checkpointed after every batch so an
+interrupted scan resumes where it stopped.
+"""
+import asyncio
+import datetime
+import functools
+import json
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; scans there are single-process anyway
+    fcntl = None
+
+# Configuration
+SCAN_CHECKPOINTS = Path("logs") / "scan_checkpoints.json"
+SCAN_BATCH_SIZE = 200          # messages per predict_batch call
+SCAN_MAX_CONCURRENT = 2        # scans running at once across all guilds
+SCAN_BATCH_DELAY = 0.5         # seconds to yield between batches
+SCAN_PROGRESS_EVERY = 5000     # messages between progress reports
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prism-scan")
+_semaphore = None
+_active = set()
+
+
+def parse_since(value):
+    """Accepts '7d', '12h', '30m' or an ISO date; returns an aware datetime."""
+    m = re.fullmatch(r"(\d+)([dhm])", value.strip().lower())
+    if m:
+        n, unit = int(m.group(1)), m.group(2)
+        delta = {"d": datetime.timedelta(days=n),
+                 "h": datetime.timedelta(hours=n),
+                 "m": datetime.timedelta(minutes=n)}[unit]
+        return datetime.datetime.now(datetime.timezone.utc) - delta
+    dt = datetime.datetime.fromisoformat(value.strip())
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+
+class ScanCheckpoints:
+    """
+    Per-channel scan progress, persisted as JSON.
+
+    Every update re-reads the file and merges into it under a lock (a
+    thread lock plus an flock on a side file), so concurrent scans - and
+    several shard processes - never drop each other's entries.
+    """
+
+    def __init__(self, path=SCAN_CHECKPOINTS):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading scan checkpoints: {e}")
+            return {}
+
+    def get(self, channel_id):
+        return self._read().get(str(channel_id))
+
+    def update(self, channel_id, **fields):
+        with self._lock, open(self.path.with_suffix(".lock"), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            entry = data.setdefault(str(channel_id), {})
+            entry.update(fields)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            tmp.replace(self.path)
+        return entry
+
+
+def is_scanning(channel_id):
+    return channel_id in _active
+
+
+async def scan_channel(channel, classify, *, after=None, limit=None,
+                       checkpoints=None, on_hit=None, on_progress=None,
+                       batch_size=SCAN_BATCH_SIZE):
+    """
+    Scans channel.history() oldest-first starting after `after`.
+
+    classify(texts) -> [(label, prob)] runs on the scan worker thread (so a
+    backfill never competes with live moderation for the default executor),
+    or is awaited if it is a coroutine function (the sharded scoring client,
+    where scoring happens in the service).
+    on_hit(message, label, prob) is awaited for every non-normal result and
+    returns the action taken (or None). on_progress(summary) is awaited every
+    SCAN_PROGRESS_EVERY messages. Returns a Counter summary.
+    """
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(SCAN_MAX_CONCURRENT)
+
+    loop = asyncio.get_running_loop()
+    summary = Counter()
+    batch = []
+    last_id = None
+    next_report = SCAN_PROGRESS_EVERY
+
+    async def flush():
+        if batch:
+            texts = [m.content for m in batch]
+            if asyncio.iscoroutinefunction(classify):
+                results = await classify(texts)
+            else:
+                results = await loop.run_in_executor(_executor, classify, texts)
+            for msg, (label, prob) in zip(batch, results):
+                if label == "normal" or on_hit is None:
+                    continue
+                action = await on_hit(msg, label, prob)
+                if action:
+                    summary[action] += 1
+                    summary[f"label:{label}"] += 1
+            batch.clear()
+        if checkpoints is not None and last_id is not None:
+            # re-read + flock + write: keep it off the event loop
+            await loop.run_in_executor(_executor, functools.partial(
+                checkpoints.update, channel.id, after=last_id,
+                scanned=summary["scanned"], done=False))
+        await asyncio.sleep(SCAN_BATCH_DELAY)
+
+    _active.add(channel.id)
+    try:
+        async with _semaphore:
+            async for msg in channel.history(limit=limit, after=after, oldest_first=True):
+                summary["scanned"] += 1
+                last_id = msg.id
+                if msg.author.bot or not (msg.content or "").strip():
+                    summary["skipped"] += 1
+                else:
+                    batch.append(msg)
+                if len(batch) >= batch_size:
+                    await flush()
+                if on_progress is not None and summary["scanned"] >= next_report:
+                    next_report += SCAN_PROGRESS_EVERY
+                    await on_progress(summary)
+            await flush()
+            if checkpoints is not None:
+                await loop.run_in_executor(_executor, functools.partial(
+                    checkpoints.update, channel.id, scanned=summary["scanned"], done=True,
+                    finished=datetime.datetime.now().isoformat()))
+    finally:
+        _active.discard(channel.id)
+    return summary
@@ -0,0 +1,177 @@
+# utils/scheduler.py
+"""
+Per-guild fair scheduling between the gateway handlers and classification.
+
+Each guild gets its own FIFO queue. A dispatcher picks work across guilds
+with deficit round-robin (weight 1 by default), caps how many jobs one
+guild may have running at once, and caps total concurrency. A raid that
+floods one guild's queue therefore only delays that guild. Queue latency
+(submit -> start) is tracked per guild.
+"""
+import asyncio
+import time
+from collections import deque
+
+# Configuration
+SCHED_WORKERS = 8                 # jobs running at once across all guilds
+SCHED_PER_GUILD_LIMIT = 2         # jobs running at once for a single guild
+SCHED_QUANTUM = 1.0               # jobs credited per round per unit of weight
+SCHED_MAX_QUEUE_PER_GUILD = 5000  # submissions beyond this are rejected
+SCHED_LATENCY_WINDOW = 1000       # recent latencies kept per guild
+
+
+class _GuildQueue:
+    __slots__ = ("jobs", "deficit", "weight", "running", "in_ring",
+                 "latencies", "submitted", "completed", "rejected", "max_depth")
+
+    def __init__(self, weight=1.0):
+        self.jobs = deque()
+        self.deficit = 0.0
+        self.weight = weight
+        self.running = 0
+        self.in_ring = False
+        self.latencies = deque(maxlen=SCHED_LATENCY_WINDOW)
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+
+class FairScheduler:
+    def __init__(self, workers=SCHED_WORKERS, per_guild_limit=SCHED_PER_GUILD_LIMIT,
+                 quantum=SCHED_QUANTUM, max_queue=SCHED_MAX_QUEUE_PER_GUILD):
+        self.workers = workers
+        self.per_guild_limit = per_guild_limit
+        self.quantum = quantum
+        self.max_queue = max_queue
+        self._queues = {}
+        self._ring = deque()          # guilds with queued jobs, in service order
+        self._free = workers
+        self._wakeup = None
+        self._dispatcher = None
+        self._tasks = set()
+
+    def _queue(self, guild_id):
+        q = self._queues.get(guild_id)
+        if q is None:
+            q = self._queues[guild_id] = _GuildQueue()
+        return q
+
+    def set_weight(self, guild_id, weight):
+        """Guilds with a higher weight get proportionally more turns."""
+        self._queue(guild_id).weight = weight
+
+    def submit(self, guild_id, job):
+        """
+        Queues job (an async callable taking no arguments) for guild_id and
+        returns a future for its result. Raises asyncio.QueueFull when the
+        guild's queue is at max_queue.
+        """
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch_loop())
+
+        q = self._queue(guild_id)
+        if len(q.jobs) >= self.max_queue:
+            q.rejected += 1
+            raise asyncio.QueueFull(f"guild {guild_id} queue is full")
+
+        future = loop.create_future()
+        q.jobs.append((job, future, time.monotonic()))
+        q.submitted += 1
+        q.max_depth = max(q.max_depth, len(q.jobs))
+        if not q.in_ring:
+            q.in_ring = True
+            self._ring.append(guild_id)
+        self._wakeup.set()
+        return future
+
+    def _next_job(self):
+        """Deficit round-robin over guilds that have work and spare concurrency."""
+        for _ in range(len(self._ring)):
+            guild_id = self._ring[0]
+            q = self._queues[guild_id]
+            if q.running >= self.per_guild_limit:
+                self._ring.rotate(-1)
+                continue
+            if q.deficit < 1:
+                q.deficit += self.quantum * q.weight
+            if q.deficit < 1:
+                self._ring.rotate(-1)
+                continue
+
+            q.deficit -= 1
+            item = q.jobs.popleft()
+            if not q.jobs:
+                # an idle guild doesn't bank credit
+                self._ring.popleft()
+                q.in_ring = False
+                q.deficit = 0.0
+            elif q.deficit < 1:
+                self._ring.rotate(-1)
+            return guild_id, item
+        return None
+
+    async def _dispatch_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._free > 0:
+                picked = self._next_job()
+                if picked is None:
+                    break
+                guild_id, (job, future, submitted) = picked
+                q = self._queues[guild_id]
+                q.latencies.append(time.monotonic() - submitted)
+                q.running += 1
+                self._free -= 1
+                task = asyncio.create_task(self._run(q, job, future))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, q, job, future):
+        try:
+            result = await job()
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            q.running -= 1
+            q.completed += 1
+            self._free += 1
+            self._wakeup.set()
+
+    def oldest_wait(self, guild_id=None):
+        """Seconds the longest-waiting queued job (of guild_id, or any guild) has been waiting."""
+        now = time.monotonic()
+        if guild_id is not None:
+            q = self._queues.get(guild_id)
+            return now - q.jobs[0][2] if q is not None and q.jobs else 0.0
+        return max((now - q.jobs[0][2] for q in self._queues.values() if q.jobs), default=0.0)
+
+    def pending(self):
+        return sum(len(q.jobs) for q in self._queues.values())
+
+    def guild_stats(self, guild_id):
+        """Queue depth and submit->start latency for one guild (seconds)."""
+        q = self._queues.get(guild_id)
+        if q is None:
+            return None
+        lat = sorted(q.latencies)
+        return {
+            "queued": len(q.jobs),
+            "running": q.running,
+            "submitted": q.submitted,
+            "completed": q.completed,
+            "rejected": q.rejected,
+            "max_depth": q.max_depth,
+            "latency_mean": sum(lat) / len(lat) if lat else 0.0,
+            "latency_p95": lat[int(0.95 * (len(lat) - 1))] if lat else 0.0,
+            "latency_max": lat[-1] if lat else 0.0,
+        }
+
+    def stats(self):
+        return {guild_id: self.guild_stats(guild_id) for guild_id in self._queues}
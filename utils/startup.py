@@ -0,0 +1,141 @@
+# utils/startup.py
+"""
+Bot start-up: deferred imports, background model warm-up and a timing report.
+
+bot.py only imports what the gateway handshake needs. Everything heavy
+(joblib/sklearn via the model, numpy, the HTML logger) is imported on a
+background thread started from on_ready, which then loads the model and
+runs a few dummy predictions so the first real message doesn't pay for it.
+Handlers await wait_ready() before touching the model.
+"""
+import asyncio
+import importlib
+import threading
+import time
+from concurrent.futures import Future
+
+# Modules kept out of bot.py's import path; imported during warm-up
+DEFERRED_MODULES = (
+    "model.predict",
+    "model.online",
+    "utils.logger",
+    "utils.report_generator",
+)
+WARMUP_TEXTS = [
+    "hey how is everyone doing today",
+    "click here for free nitro giveaway",
+    "verify your account password here",
+    "you are such a loser nobody likes you",
+]
+
+_load_model = True
+_import_times = {}
+_timings = {}
+_memory = {}
+_future = None
+_callbacks = []
+_lock = threading.Lock()
+
+
+def use_remote_scoring():
+    """Sharded mode: the scoring service holds the model, so don't load it here."""
+    global _load_model
+    _load_model = False
+
+
+def record_import(name, seconds):
+    """Records the import time of a module imported outside warm-up (e.g. discord)."""
+    _import_times[name] = seconds
+
+
+def _timed_import(name):
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times[name] = time.perf_counter() - t0
+    return module
+
+
+def _warm_up(future):
+    try:
+        t_start = time.perf_counter()
+        for name in DEFERRED_MODULES:
+            _timed_import(name)
+        _timings["imports"] = time.perf_counter() - t_start
+
+        from model import predict
+        from utils.preprocess import clean_text
+
+        t0 = time.perf_counter()
+        model = predict.load_model() if _load_model else None
+        prefilter = predict.load_prefilter()
+        _timings["model_load"] = time.perf_counter() - t0
+
+        # exercise both tiers without counting towards the prefilter stats
+        t0 = time.perf_counter()
+        cleaned = [clean_text(t) for t in WARMUP_TEXTS]
+        for text, c in zip(WARMUP_TEXTS, cleaned):
+            prefilter.decide(text, c)
+        if model is not None:
+            model.predict_proba(cleaned)
+            model.predict_proba(cleaned[:1])
+        _timings["warmup_predictions"] = time.perf_counter() - t0
+
+        _timings["total"] = time.perf_counter() - t_start
+
+        from utils.logger import recent_events
+        _memory["recent_events"] = recent_events.stats()
+        future.set_result(report())
+    except Exception as e:
+        future.set_exception(e)
+
+
+def start_warmup():
+    """Starts the warm-up thread once; returns its concurrent.futures.Future."""
+    global _future
+    with _lock:
+        # a failed warm-up (e.g. model not trained yet) is retried on next use
+        if _future is None or (_future.done() and _future.exception() is not None):
+            _future = Future()
+            for fn in _callbacks:
+                _future.add_done_callback(fn)
+            threading.Thread(target=_warm_up, args=(_future,),
+                             name="prism-warmup", daemon=True).start()
+        return _future
+
+
+def add_done_callback(fn):
+    """
+    Calls fn(future) whenever a warm-up attempt finishes, including retries
+    after a failed one; called right away if warm-up already finished.
+    """
+    with _lock:
+        _callbacks.append(fn)
+        future = _future
+    if future is not None:
+        future.add_done_callback(fn)
+
+
+async def wait_ready():
+    """Awaits warm-up without blocking the event loop."""
+    return await asyncio.wrap_future(start_warmup())
+
+
+def is_ready():
+    return _future is not None and _future.done() and _future.exception() is None
+
+
+def report():
+    return {"imports": dict(_import_times), "timings": dict(_timings), "memory": dict(_memory)}
+
+
+def format_report():
+    lines = ["PRISM startup report:"]
+    for name, secs in sorted(_import_times.items(), key=lambda kv: -kv[1]):
+        lines.append(f"  import {name:<24} {secs * 1000:8.1f} ms")
+    for name, secs in _timings.items():
+        lines.append(f"  {name:<31} {secs * 1000:8.1f} ms")
+    recent = _memory.get("recent_events")
+    if recent:
+        lines.append(f"  recent events buffer: {recent['events']}/{recent['capacity']} events, "
+                     f"{recent['bytes'] / 1024:.0f}/{recent['max_bytes'] / 1024:.0f} KiB")
+    return "\n".join(lines)